@@ -26,6 +26,7 @@ if str(SRC_DIR) not in sys.path:
 # Import our automation modules
 from automation.hmecloud import download_all_stores
 from automation.complete_automation import main as run_complete_automation
+from automation.context import RunContext
 
 # ========== CONFIGURATION ==========
 DEFAULT_DATE = datetime.now() - timedelta(days=1)
@@ -34,22 +35,31 @@ DOWNLOADS_FOLDER = str((DATA_DIR / "downloads").resolve())
 # ===================================
 
 
-def full_automation(report_date=None, skip_download=False):
+def full_automation(report_date=None, skip_download=False, start_date=None):
     """
     Run complete end-to-end automation
     
     Args:
         report_date: Date to download reports for (default: yesterday)
         skip_download: If True, skip HMECloud download (use existing files)
+        start_date: First day of a catch-up range ending at report_date -
+            every day is downloaded, then the template is updated once
     """
     
     if report_date is None:
         report_date = DEFAULT_DATE
     
+    # One context for both phases - the update uses exactly this run's downloads
+    ctx = RunContext.default(target_date=report_date, start_date=start_date)
+    report_dates = ctx.report_dates()
+    
     print("\n" + "="*80)
     print("🍗 KFC GUYANA - FULL END-TO-END AUTOMATION")
     print("="*80)
-    print(f"Target date: {report_date.strftime('%B %d, %Y')}")
+    if start_date is not None:
+        print(f"Date range: {start_date.strftime('%B %d, %Y')} - {report_date.strftime('%B %d, %Y')} ({len(report_dates)} days)")
+    else:
+        print(f"Target date: {report_date.strftime('%B %d, %Y')}")
     print(f"Skip download: {skip_download}")
     print("="*80)
     
@@ -59,7 +69,9 @@ def full_automation(report_date=None, skip_download=False):
         print("PHASE 1: DOWNLOADING FROM HMECLOUD")
         print("="*80)
         
-        download_success = download_all_stores(report_date=report_date)
+        download_success = True
+        for day in report_dates:
+            download_success = download_all_stores(report_date=day, ctx=ctx) and download_success
         
         if not download_success:
             print("\n⚠️  Warning: Some downloads may have failed")
@@ -75,7 +87,7 @@ def full_automation(report_date=None, skip_download=False):
     print("PHASE 2: PROCESSING DATA & UPDATING TEMPLATE")
     print("="*80)
     
-    processing_success = run_complete_automation()
+    processing_success = run_complete_automation(ctx=ctx)
     
     if not processing_success:
         print("\n❌ Data processing failed!")
@@ -150,10 +162,14 @@ if __name__ == "__main__":
         if sys.argv[1] == "--skip-download":
             # Run with skip download
             full_automation(skip_download=True)
+        elif sys.argv[1] == "--catch-up" and len(sys.argv) > 2:
+            # Download every day since the given date, update the template once
+            full_automation(start_date=datetime.strptime(sys.argv[2], "%Y-%m-%d"))
         elif sys.argv[1] == "--help" or sys.argv[1] == "-h":
             print("\nFULL AUTOMATION SCRIPT - USAGE:")
             print("\n  python3 full_automation.py              # Interactive mode")
             print("  python3 full_automation.py --skip-download # Use existing files")
+            print("  python3 full_automation.py --catch-up 2025-10-10 # Every day since a date, one template save")
             print("  python3 full_automation.py --help          # Show this help")
             print()
         else:
@@ -10,12 +10,25 @@ USAGE:
 """
 
 import os
-import glob
+import io
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from .transform_data import transform_raw_car_data
+import pandas as pd
+from . import transform_data
+from .transform_data import transform_raw_car_data, parse_departure_times
+from .transform_cache import cached_transform, file_digest
+from .journal import RunJournal
+from .inmemory import load_buffer, buffer_digest, transform_buffers, archive_files
+from .context import RunContext
+from . import template_writer
+from .ledger import IngestLedger, StoreWatermarks, filter_new_rows
+from .xlsx_access import release_all
 from .template_operations import (
     create_backup,
+    load_template,
     paste_to_template,
     concatenate_formulas,
     refresh_pivot_tables,
@@ -29,6 +42,11 @@ DATA_DIR = BASE_DIR / "data"
 DOWNLOADS_FOLDER = str((DATA_DIR / "downloads").resolve())
 TEMPLATE_PATH = str((DATA_DIR / "templates" / "Drive Thru Optimization - KFC Guyana  (16-10)-copy.xlsx").resolve())
 TARGET_SHEET = "AllStores"  # Or "Raw Data" - will auto-detect
+USE_TRANSFORM_CACHE = True  # Reuse transformed frames for unchanged downloads
+TRANSFORM_JOBS = os.cpu_count() or 1  # Files transformed in parallel (1 = one at a time)
+USE_INGEST_LEDGER = True  # Drop events already pasted into the template
+USE_STORE_WATERMARKS = True  # Only paste rows after each store's newest event in the template
+IN_MEMORY_BACKUP = False  # In-memory runs skip the template backup copy (the save itself is atomic)
 
 # Columns with formulas (yellow headers) - UPDATE these column numbers
 FORMULA_COLUMNS = [12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22]  # Columns L through V
@@ -43,118 +61,600 @@ DATE_CONFIGS = {
     "Day review - Txns time": "A1"
 }
 
-TARGET_DATE = datetime.now() - timedelta(days=1)  # Yesterday
+TARGET_DATE = None  # Report date - None means yesterday, worked out when the run starts
 # ===================================
 
-def main():
-    """Main automation workflow"""
+def resolve_target_date(target_date=None):
+    """Report date for a run: the given date, else TARGET_DATE, else yesterday"""
+    if target_date is None:
+        target_date = TARGET_DATE
+    if target_date is None:
+        target_date = datetime.now() - timedelta(days=1)
+    return target_date
+
+
+def select_date_range(data_frames, start_date, end_date):
+    """
+    Keep rows departing between start_date and end_date (whole days)
+
+    Frames are returned in chronological order so a multi-day catch-up is
+    pasted oldest day first; days in the range without any rows are reported.
+
+    Args:
+        data_frames: List of transformed DataFrames
+        start_date: First day of the range
+        end_date: Last day of the range
+
+    Returns:
+        List of DataFrames (frames left empty are dropped)
+    """
+    first_day = pd.Timestamp(start_date).normalize()
+    last_day = pd.Timestamp(end_date).normalize()
+
+    selected = []
+    days_found = set()
+    for df in data_frames:
+        days = parse_departure_times(df['Departure Time']).dt.normalize()
+        in_range = days.between(first_day, last_day)
+        dropped = int((~in_range).sum())
+        if dropped:
+            print(f"   ⏭️  {os.path.basename(df.attrs.get('source_file', ''))}: {dropped} rows outside the date range")
+        if in_range.any():
+            attrs = dict(df.attrs, partial=dropped > 0)
+            kept = df[in_range].reset_index(drop=True)
+            kept.attrs = attrs
+            selected.append((days[in_range].min(), kept))
+            days_found.update(days[in_range].unique())
+
+    for day in pd.date_range(first_day, last_day, freq='D'):
+        if day not in days_found:
+            print(f"   ⚠️  No data for {day.strftime('%Y-%m-%d')}")
+
+    selected.sort(key=lambda item: item[0])
+    return [df for _, df in selected]
+
+
+def covered_days(data_frames, report_dates):
+    """
+    Report dates that have rows in the frames
+
+    Args:
+        data_frames: List of transformed DataFrames
+        report_dates: Dates of the run (see RunContext.report_dates)
+
+    Returns:
+        Set of 'YYYY-MM-DD' strings
+    """
+    wanted = {day.strftime('%Y-%m-%d') for day in report_dates}
+    found = set()
+    for df in data_frames:
+        days = parse_departure_times(df['Departure Time']).dropna()
+        found.update(days.dt.strftime('%Y-%m-%d').unique())
+    return wanted & found
+
+
+def _transform_file(raw_file, use_cache=USE_TRANSFORM_CACHE):
+    """Transform one raw file (through the cache when enabled)"""
+    if use_cache:
+        return cached_transform(raw_file)
+    return transform_raw_car_data(raw_file)
+
+
+def _init_transform_worker():
+    """Workers already run in parallel - keep each file's sheet parse in-process"""
+    transform_data.PARALLEL_PARSE_WORKERS = 1
+
+
+def _transform_worker(raw_file, use_cache):
+    """
+    Transform one file in a worker process
+
+    Output is captured so the parent can print each file's log in order.
+
+    Returns:
+        Tuple of (DataFrame or None, captured output, error message or None)
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            return _transform_file(raw_file, use_cache), output.getvalue(), None
+        except Exception as e:
+            return None, output.getvalue(), str(e)
+
+
+def transform_files(raw_files, jobs=None):
+    """
+    Transform raw files, in parallel processes when jobs > 1
+
+    Args:
+        raw_files: List of raw Excel files
+        jobs: Number of worker processes (default: TRANSFORM_JOBS)
+
+    Returns:
+        List of transformed DataFrames, in raw_files order (failed files skipped)
+    """
+    if jobs is None:
+        jobs = TRANSFORM_JOBS
+    transformed_dataframes = []
+
+    if jobs <= 1 or len(raw_files) <= 1:
+        for raw_file in raw_files:
+            try:
+                df = _transform_file(raw_file, USE_TRANSFORM_CACHE)
+                df.attrs['source_file'] = raw_file
+                transformed_dataframes.append(df)
+            except Exception as e:
+                print(f"   ❌ Error transforming {os.path.basename(raw_file)}: {e}")
+        return transformed_dataframes
+
+    jobs = min(jobs, len(raw_files))
+    print(f"   Transforming {len(raw_files)} files with {jobs} processes")
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_transform_worker) as executor:
+        futures = [executor.submit(_transform_worker, raw_file, USE_TRANSFORM_CACHE) for raw_file in raw_files]
+        for raw_file, future in zip(raw_files, futures):
+            try:
+                df, output, error = future.result()
+            except Exception as e:
+                df, output, error = None, '', str(e)
+            print(output, end='')
+            if error is not None:
+                print(f"   ❌ Error transforming {os.path.basename(raw_file)}: {error}")
+            else:
+                df.attrs['source_file'] = raw_file
+                transformed_dataframes.append(df)
+
+    return transformed_dataframes
+
+
+def _discard_template_prep(backup_future, wb_future):
+    """Wait for the background backup/load of a run with nothing to paste and undo them"""
+    if backup_future is not None:
+        try:
+            os.remove(backup_future.result())
+        except Exception:
+            pass
+    if wb_future is not None:
+        try:
+            wb_future.result().close()
+        except Exception:
+            pass
+
+
+def _template_stamp(template_path):
+    """Identity of the template file on disk (changes whenever it is saved)"""
+    try:
+        stat = os.stat(template_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def prefetch_template(ctx):
+    """
+    Start the template backup and load on background threads
     
-    print("="*80)
-    print("🍗 KFC GUYANA - COMPLETE DRIVE-THRU AUTOMATION")
-    print("="*80)
-    print(f"Target date: {TARGET_DATE.strftime('%B %d, %Y')}")
-    print("="*80)
+    Called before the transform so both overlap it. The writer uses the
+    loaded workbook only if the template is unchanged by then; a run whose
+    job is applied by another writer discards it.
     
-    # STEP 1: Find downloaded files
-    print("\n" + "="*80)
-    print("STEP 1: Finding downloaded Excel files")
-    print("="*80)
+    Returns:
+        Dict with the template stamp and the backup / workbook futures
+    """
+    background = ThreadPoolExecutor(max_workers=2, thread_name_prefix='template')
+    prefetch = {'stamp': _template_stamp(ctx.template_path), 'backup': None, 'used': False}
+    if IN_MEMORY_BACKUP or not ctx.in_memory:
+        prefetch['backup'] = background.submit(create_backup, ctx.template_path)
+    prefetch['workbook'] = background.submit(load_template, ctx.template_path)
+    background.shutdown(wait=False)
+    return prefetch
+
+
+def discard_prefetch(prefetch):
+    """Drop a prefetched backup and workbook the writer didn't take"""
+    if prefetch is not None and not prefetch['used']:
+        prefetch['used'] = True
+        _discard_template_prep(prefetch['backup'], prefetch['workbook'])
+
+
+def _apply_batch(ctx, collect, prefetch=None):
+    """
+    Paste every spooled run into the template in one load/save cycle
     
-    raw_files = glob.glob(os.path.join(DOWNLOADS_FOLDER, "*.xlsx"))
-    raw_files = [f for f in raw_files if not f.endswith('_transformed.xlsx')]
+    Called by the template writer with the template lock held.
     
-    print(f"Found {len(raw_files)} raw Excel files:")
-    for f in raw_files:
-        print(f"   - {os.path.basename(f)}")
+    Args:
+        ctx: RunContext of the run serving the batch (template, sheet, formulas, date cells)
+        collect: Waits out the group-commit window and returns {job id: job}
+        prefetch: Backup and workbook started by prefetch_template() during
+            this process's transform (used if the template is unchanged)
     
-    if len(raw_files) == 0:
-        print("\n❌ No files found in downloads/ folder!")
-        print(f"   Please download Raw Car Data files to: {DOWNLOADS_FOLDER}")
-        return False
+    Returns:
+        Dict of {job id: result dict}
+    """
+    # Settle any interrupted run before touching the template
+    journal = RunJournal(ctx.template_path)
+    previous = journal.recover()
+    consumed = journal.consumed_files()
     
-    # STEP 2: Transform each file
-    print("\n" + "="*80)
-    print("STEP 2: Transforming data (Ctrl+D replacement)")
-    print("="*80)
+    backup_future = wb_future = None
+    if prefetch is not None and not prefetch['used']:
+        prefetch['used'] = True
+        if prefetch['stamp'] is not None and prefetch['stamp'] == _template_stamp(ctx.template_path):
+            print("   ⚡ Using the template loaded during the transform")
+            backup_future, wb_future = prefetch['backup'], prefetch['workbook']
+            if previous.get('backup'):
+                # The interrupted run's backup is kept instead
+                _discard_template_prep(backup_future, None)
+                backup_future = None
+        else:
+            print("   🔄 Template changed since it was loaded - loading it again")
+            _discard_template_prep(prefetch['backup'], prefetch['workbook'])
     
-    transformed_dataframes = []
+    if wb_future is None:
+        # The backup and template load don't depend on the batch - run them on
+        # background threads while the window collects submissions
+        background = ThreadPoolExecutor(max_workers=2, thread_name_prefix='template')
+        take_backup = IN_MEMORY_BACKUP or not ctx.in_memory
+        if take_backup and not previous.get('backup'):
+            backup_future = background.submit(create_backup, ctx.template_path)
+        wb_future = background.submit(load_template, ctx.template_path)
+        background.shutdown(wait=False)
     
-    for raw_file in raw_files:
-        try:
-            df = transform_raw_car_data(raw_file)
+    jobs = collect()
+    results = {job_id: {'success': True, 'rows_added': 0, 'batch_size': len(jobs)} for job_id in jobs}
+    target_date = max(job['target_date'] for job in jobs.values())
+    
+    # Files already pasted - by a finished run or by an earlier job in this batch
+    transformed_dataframes = []
+    file_digests = {}
+    by_digest = {}
+    for job_id, job in jobs.items():
+        for df in job['frames']:
+            source_file = df.attrs['source_file']
+            digest = job['file_digests'][source_file]
+            entry = consumed.get(digest)
+            if entry:
+                print(f"   ⏭️  {os.path.basename(source_file)}: already pasted to '{entry['sheet']}' rows {entry['first_row']}-{entry['last_row']}")
+                continue
+            if digest in by_digest:
+                # Same file from two callers - paste once, report to both
+                print(f"   ⏭️  {os.path.basename(source_file)}: submitted twice in this batch")
+                by_digest[digest].attrs['jobs'].append(job_id)
+                continue
+            df.attrs['jobs'] = [job_id]
+            df.attrs['range'] = job['start_date'] is not None
+            file_digests[source_file] = digest
+            by_digest[digest] = df
             transformed_dataframes.append(df)
-        except Exception as e:
-            print(f"   ❌ Error transforming {os.path.basename(raw_file)}: {e}")
     
     if len(transformed_dataframes) == 0:
-        print("\n❌ No data transformed successfully!")
-        return False
+        print("\n✅ Every file was already pasted into the template - nothing to do")
+        _discard_template_prep(backup_future, wb_future)
+        return results
     
-    print(f"\n✅ Transformed {len(transformed_dataframes)} files")
+    journal.begin(
+        file_digests,
+        target_date,
+        resumes=previous['run'] if previous['status'] == 'interrupted' else None
+    )
     total_rows = sum(len(df) for df in transformed_dataframes)
-    print(f"   Total rows: {total_rows}")
+    journal.stage('transform', rows=total_rows, jobs=list(jobs))
+    
+    # Keep only each store's tail after the newest event already in the
+    # template - the marks come from a sidecar, not from AllStores. A
+    # catch-up range may backfill older days, so it leaves this to the ledger
+    watermarks = None
+    if USE_STORE_WATERMARKS:
+        watermarks = StoreWatermarks.for_template(ctx.template_path, ctx.target_sheet)
+        tails = []
+        for df in transformed_dataframes:
+            if not df.attrs['range']:
+                df, dropped = watermarks.tail(df, inclusive=USE_INGEST_LEDGER)
+                if dropped:
+                    print(f"   ⏭️  {os.path.basename(df.attrs['source_file'])}: {dropped} rows older than the store's last pasted event")
+            if len(df) > 0:
+                tails.append(df)
+        transformed_dataframes = tails
+        total_rows = sum(len(df) for df in transformed_dataframes)
+        journal.stage('watermarks', rows=total_rows)
+    
+    # Drop events the template already has (e.g. a day downloaded twice);
+    # keys are added as each frame is checked so the same day in two files
+    # is only pasted once, and the ledger is saved with the template
+    ledger = None
+    if USE_INGEST_LEDGER:
+        ledger = IngestLedger.for_template(ctx.template_path, ctx.target_sheet)
+        filtered = []
+        for df in transformed_dataframes:
+            df, keys, dropped = filter_new_rows(df, ledger)
+            if dropped:
+                print(f"   ⏭️  {os.path.basename(df.attrs['source_file'])}: {dropped} rows already in template")
+            if len(df) > 0:
+                filtered.append(df)
+                ledger.add(keys)
+        transformed_dataframes = filtered
+        total_rows = sum(len(df) for df in transformed_dataframes)
+        journal.stage('ledger', rows=total_rows)
+    
+    if len(transformed_dataframes) == 0:
+        print("\n✅ All events are already in the template - nothing to paste")
+        _discard_template_prep(backup_future, wb_future)
+        journal.commit()
+        return results
+    
+    if watermarks is not None:
+        for df in transformed_dataframes:
+            watermarks.update(df)
     
     # STEP 3: Create backup and load template
     print("\n" + "="*80)
     print("STEP 3: Preparing template")
     print("="*80)
     
-    backup_path = create_backup(TEMPLATE_PATH)
+    if backup_future is not None:
+        with ctx.timed('backup (wait)'):
+            backup_path = backup_future.result()
+    elif previous.get('backup'):
+        # Template is untouched since the interrupted run took this backup
+        backup_path = previous['backup']
+        print(f"\n♻️  Reusing backup from interrupted run: {backup_path}")
+    else:
+        backup_path = None
+        print("\n⏭️  No backup copy (in-memory run)")
+    if backup_path:
+        journal.backup(backup_path)
     
     # STEP 4: Paste data into template
     print("\n" + "="*80)
     print("STEP 4: Pasting data into template")
     print("="*80)
     
-    wb = paste_to_template(transformed_dataframes, TEMPLATE_PATH, TARGET_SHEET)
-    
-    # STEP 5: Concatenate formulas
-    print("\n" + "="*80)
-    print("STEP 5: Concatenating formulas")
-    print("="*80)
+    with ctx.timed('paste'):
+        wb = paste_to_template(transformed_dataframes, ctx.template_path, ctx.target_sheet, wb=wb_future.result())
     
     # Find the target sheet name (might have changed)
     target_ws_name = None
-    for name in [TARGET_SHEET, 'AllStores', 'Allstores', 'Raw Data']:
+    for name in [ctx.target_sheet, 'AllStores', 'Allstores', 'Raw Data']:
         if name in wb.sheetnames:
             target_ws_name = name
             break
     
-    if target_ws_name and len(FORMULA_COLUMNS) > 0:
-        ws = wb[target_ws_name]
-        last_row = ws.max_row
+    if target_ws_name:
+        last_row = wb[target_ws_name].max_row
         first_new_row = last_row - total_rows + 1
         
-        wb = concatenate_formulas(
-            wb,
-            target_ws_name,
-            first_new_row,
-            last_row,
-            FORMULA_COLUMNS
-        )
+        ranges = []
+        row = first_new_row
+        for df in transformed_dataframes:
+            source_file = df.attrs['source_file']
+            ranges.append((source_file, file_digests[source_file], row, row + len(df) - 1))
+            row += len(df)
+        journal.pasted(target_ws_name, ranges, partial={
+            df.attrs['source_file'] for df in transformed_dataframes if df.attrs.get('partial')
+        })
+    
+    # STEP 5: Concatenate formulas
+    print("\n" + "="*80)
+    print("STEP 5: Concatenating formulas")
+    print("="*80)
+    
+    if target_ws_name and len(ctx.formula_columns) > 0:
+        with ctx.timed('formulas'):
+            wb = concatenate_formulas(
+                wb,
+                target_ws_name,
+                first_new_row,
+                last_row,
+                ctx.formula_columns
+            )
     else:
         print("   ⚠️  Skipping formula concatenation (configure FORMULA_COLUMNS)")
+    journal.stage('formulas')
     
     # STEP 6: Refresh pivot tables
     print("\n" + "="*80)
     print("STEP 6: Refreshing pivot tables")
     print("="*80)
     
-    wb = refresh_pivot_tables(wb)
+    with ctx.timed('pivots'):
+        wb = refresh_pivot_tables(wb)
+    journal.stage('pivots')
     
     # STEP 7: Update dates
     print("\n" + "="*80)
     print("STEP 7: Updating dates in sheets")
     print("="*80)
     
-    wb = update_dates(wb, TARGET_DATE, DATE_CONFIGS)
+    wb = update_dates(wb, target_date, ctx.date_configs)
+    journal.stage('dates')
     
     # STEP 8: Save final template
     print("\n" + "="*80)
     print("STEP 8: Saving final template")
     print("="*80)
     
-    save_template(wb, TEMPLATE_PATH)
+    with ctx.timed('save'):
+        save_template(wb, ctx.template_path, before_replace=journal.saving)
+    journal.saved()
+    if ledger is not None:
+        ledger.save()
+    if watermarks is not None:
+        watermarks.save()
+    journal.commit()
+    release_all()
+    
+    for df in transformed_dataframes:
+        for job_id in df.attrs['jobs']:
+            results[job_id]['rows_added'] += len(df)
+    for result in results.values():
+        result['backup_path'] = backup_path
+    return results
+
+
+def update_template(ctx, data_frames, file_digests, prefetch=None):
+    """
+    Steps 3-8 for transformed frames, through the template writer
+    
+    Shared by main() and the pipeline's update stage, so every template
+    update goes through the same journal, ledger and high-water marks.
+    
+    Args:
+        ctx: RunContext of the run (template, dates, in-memory mode)
+        data_frames: Transformed DataFrames (attrs['source_file'] set)
+        file_digests: Dict of {source file: content hash}
+        prefetch: See prefetch_template()
+    
+    Returns:
+        Result dict of the submission (see _apply_batch)
+    """
+    with ctx.timed('template update'):
+        try:
+            return template_writer.submit(
+                ctx.template_path,
+                {
+                    'name': ctx.name,
+                    'frames': data_frames,
+                    'file_digests': {df.attrs['source_file']: file_digests[df.attrs['source_file']]
+                                     for df in data_frames},
+                    'target_date': ctx.target_date,
+                    'start_date': ctx.start_date,
+                },
+                lambda collect: _apply_batch(ctx, collect, prefetch),
+                spool=not ctx.in_memory
+            )
+        finally:
+            # Another writer applied this job - the prefetched template isn't needed
+            discard_prefetch(prefetch)
+
+
+def main(target_date=None, start_date=None, ctx=None):
+    """
+    Main automation workflow
+    
+    Args:
+        target_date: Report date written to the date cells (default: yesterday)
+        start_date: First day of a catch-up range ending at target_date -
+            every day's files are pasted together and the template is
+            loaded and saved once
+        ctx: RunContext with the template, sheet, folders and dates of this
+            run (default: the module configuration); timings and results
+            are recorded on it
+    
+    The template itself is updated through the template writer: runs that
+    finish at about the same time are pasted in one load/save cycle.
+    """
+    
+    if ctx is None:
+        ctx = RunContext.default(target_date=target_date, start_date=start_date)
+    target_date = target_date or ctx.target_date
+    start_date = start_date or ctx.start_date
+    if start_date is not None and start_date > target_date:
+        start_date, target_date = target_date, start_date
+    ctx.target_date, ctx.start_date = target_date, start_date
+    ctx.results['success'] = False
+    
+    print("="*80)
+    print("🍗 KFC GUYANA - COMPLETE DRIVE-THRU AUTOMATION")
+    print("="*80)
+    if start_date is not None:
+        n_days = (target_date.date() - start_date.date()).days + 1
+        print(f"Date range: {start_date.strftime('%B %d, %Y')} - {target_date.strftime('%B %d, %Y')} ({n_days} days)")
+    else:
+        print(f"Target date: {target_date.strftime('%B %d, %Y')}")
+    print("="*80)
+    
+    # STEP 1: Find downloaded files
+    print("\n" + "="*80)
+    print("STEP 1: Finding downloaded Excel files")
+    print("="*80)
+    
+    raw_files = ctx.raw_files()
+    
+    print(f"Found {len(raw_files)} raw Excel files:")
+    for f in raw_files:
+        print(f"   - {os.path.basename(f)}")
+    
+    if len(raw_files) == 0:
+        print("\n❌ No files found in downloads/ folder!")
+        print(f"   Please download Raw Car Data files to: {ctx.downloads_folder}")
+        return False
+    
+    # Drop files a finished run already pasted (the writer checks again under the lock)
+    consumed = RunJournal(ctx.template_path).consumed_files()
+    if ctx.in_memory:
+        # Each export is read once; everything after works on the buffers
+        buffers = {f: load_buffer(f) for f in raw_files}
+        file_digests = {f: buffer_digest(buffers[f]) for f in raw_files}
+    else:
+        file_digests = {f: file_digest(f) for f in raw_files}
+    
+    for f in raw_files:
+        entry = consumed.get(file_digests[f])
+        if entry:
+            print(f"   ⏭️  {os.path.basename(f)}: already pasted to '{entry['sheet']}' rows {entry['first_row']}-{entry['last_row']}")
+    # A download of this run that was pasted before still covers its day
+    download_dates = {entry['path']: entry['date'] for entry in ctx.results.get('downloads', [])}
+    days = {download_dates[f] for f in raw_files if file_digests[f] in consumed and f in download_dates}
+    raw_files = [f for f in raw_files if file_digests[f] not in consumed]
+    
+    if len(raw_files) == 0:
+        print("\n✅ Every file was already pasted into the template - nothing to do")
+        ctx.results.update(success=True, days_covered=sorted(days))
+        return True
+    
+    # The backup and template load don't need the transformed data - run
+    # them on background threads while the transform works
+    prefetch = prefetch_template(ctx)
+    
+    # STEP 2: Transform each file
+    print("\n" + "="*80)
+    print("STEP 2: Transforming data (Ctrl+D replacement)")
+    print("="*80)
+    
+    with ctx.timed('transform'):
+        if ctx.in_memory:
+            transformed_dataframes = transform_buffers({f: buffers[f] for f in raw_files})
+        else:
+            transformed_dataframes = transform_files(raw_files, jobs=ctx.transform_jobs)
+    
+    if len(transformed_dataframes) == 0:
+        print("\n❌ No data transformed successfully!")
+        discard_prefetch(prefetch)
+        return False
+    
+    if start_date is not None:
+        transformed_dataframes = select_date_range(transformed_dataframes, start_date, target_date)
+        if len(transformed_dataframes) == 0:
+            # Every file was read - the stores simply had no cars (e.g. closed)
+            print("\n⚠️  No rows in the selected date range - nothing to paste")
+            discard_prefetch(prefetch)
+            ctx.results.update(success=True, rows_added=0, days_covered=sorted(days))
+            return True
+    
+    print(f"\n✅ Transformed {len(transformed_dataframes)} files")
+    total_rows = sum(len(df) for df in transformed_dataframes)
+    print(f"   Total rows: {total_rows}")
+    ctx.results['rows_transformed'] = total_rows
+    
+    # STEPS 3-8: Hand the frames to the template writer - whichever run
+    # holds the template lock pastes every pending submission at once
+    result = update_template(ctx, transformed_dataframes, file_digests, prefetch)
+    
+    if not result['success']:
+        print(f"\n❌ Template update failed: {result.get('error', 'unknown error')}")
+        return False
+    
+    total_rows = result['rows_added']
+    backup_path = result.get('backup_path')
+    days |= covered_days(transformed_dataframes, ctx.report_dates())
+    ctx.results.update(success=True, files_processed=len(raw_files), rows_added=total_rows,
+                       backup_path=backup_path, batch_size=result['batch_size'], days_covered=sorted(days))
+    
+    if ctx.in_memory and ctx.archive_folder:
+        archive_files(
+            [df.attrs['source_file'] for df in transformed_dataframes if not df.attrs.get('partial')],
+            ctx.archive_folder
+        )
     
     # FINAL SUMMARY
     print("\n" + "="*80)
@@ -163,9 +663,16 @@ def main():
     print(f"\n📊 Summary:")
     print(f"   - Files processed: {len(raw_files)}")
     print(f"   - Total rows added: {total_rows}")
-    print(f"   - Template updated: {TEMPLATE_PATH}")
-    print(f"   - Backup saved: {backup_path}")
-    print(f"   - Date set to: {TARGET_DATE.strftime('%Y-%m-%d')}")
+    print(f"   - Template updated: {ctx.template_path}")
+    if backup_path:
+        print(f"   - Backup saved: {backup_path}")
+    if result['batch_size'] > 1:
+        print(f"   - Saved together with {result['batch_size'] - 1} other run(s)")
+    print(f"   - Date set to: {target_date.strftime('%Y-%m-%d')}")
+    if ctx.timings:
+        print(f"\n⏱️  Timings:")
+        for step, seconds in ctx.timings.items():
+            print(f"   - {step}: {seconds:.1f}s")
     
     print(f"\n📋 Next steps:")
     print(f"   1. Open the template in Excel")
@@ -178,7 +685,19 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser(description="Update the Drive-Thru template from downloaded reports")
+    parser.add_argument("--date", help="Report date, or last day of a range (YYYY-MM-DD, default: yesterday)")
+    parser.add_argument("--from", dest="start", help="First day of a catch-up range (YYYY-MM-DD)")
+    parser.add_argument("--in-memory", action="store_true", help="No intermediate files - buffers and frames only")
+    parser.add_argument("--archive", help="In-memory mode: move pasted exports to this folder")
+    args = parser.parse_args()
+    
+    success = main(ctx=RunContext.default(
+        target_date=datetime.strptime(args.date, "%Y-%m-%d") if args.date else None,
+        start_date=datetime.strptime(args.start, "%Y-%m-%d") if args.start else None,
+        in_memory=args.in_memory,
+        archive_folder=args.archive,
+    ))
     
     if success:
         print("\n🎉 SUCCESS! Your Drive-Thru template is ready!")
@@ -0,0 +1,141 @@
+"""
+Run Context Module
+Per-run state passed through download, conversion and template update
+
+A RunContext holds everything one run reads (template, sheet, stores,
+download folder, formula columns, date cells, dates) and everything it
+produces (files downloaded and converted, timings, results). Functions
+take the context instead of reading module constants, so several runs
+can share a process or a host without picking up each other's files.
+"""
+
+import os
+import glob
+import time
+import threading
+import contextlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+class RunContext:
+    """Paths, dates, stores, timings and results of one automation run"""
+
+    def __init__(self, name='default', template_path=None, target_sheet='AllStores', stores=None,
+                 downloads_folder=None, formula_columns=None, date_configs=None,
+                 target_date=None, start_date=None, transform_jobs=None, in_memory=False, archive_folder=None,
+                 fresh_downloads=False):
+        self.name = name
+        self.template_path = template_path
+        self.target_sheet = target_sheet
+        self.stores = list(stores or [])
+        self.downloads_folder = str(downloads_folder) if downloads_folder else None
+        self.formula_columns = list(formula_columns or [])
+        self.date_configs = dict(date_configs or {})
+        self.target_date = target_date or (datetime.now() - timedelta(days=1))
+        self.start_date = start_date
+        self.transform_jobs = transform_jobs
+        self.in_memory = in_memory              # Buffers and frames only - see automation.inmemory
+        self.archive_folder = str(archive_folder) if archive_folder else None
+        self.fresh_downloads = fresh_downloads  # Always download - never reuse exports already in the folder
+
+        self.downloaded_files = []      # Files this run downloaded, in order
+        self.converted_files = []       # Files this run converted with the DT macro
+        self.timings = {}               # Step name -> seconds
+        self.results = {}               # Step name -> outcome
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls, **overrides):
+        """
+        Context from the module configuration (complete_automation / hmecloud)
+
+        Keyword arguments override single fields; None values are ignored.
+        """
+        from . import complete_automation, hmecloud
+
+        fields = {
+            'name': 'default',
+            'template_path': complete_automation.TEMPLATE_PATH,
+            'target_sheet': complete_automation.TARGET_SHEET,
+            'stores': hmecloud.STORES,
+            'downloads_folder': complete_automation.DOWNLOADS_FOLDER,
+            'formula_columns': complete_automation.FORMULA_COLUMNS,
+            'date_configs': complete_automation.DATE_CONFIGS,
+            'target_date': complete_automation.resolve_target_date(),
+        }
+        fields.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**fields)
+
+    @classmethod
+    def from_profile(cls, profile, **overrides):
+        """Context for a run profile (see automation.profiles)"""
+        fields = {key: profile[key] for key in (
+            'template_path', 'target_sheet', 'stores', 'downloads_folder', 'formula_columns', 'date_configs'
+        )}
+        fields['name'] = profile['name']
+        fields.update({key: value for key, value in overrides.items() if value is not None})
+        return cls.default(**fields)
+
+    def report_dates(self):
+        """Every report date of the run (one, or each day of a catch-up range)"""
+        if self.start_date is None:
+            return [self.target_date]
+        n_days = (self.target_date.date() - self.start_date.date()).days + 1
+        return [self.start_date + timedelta(days=i) for i in range(n_days)]
+
+    def add_download(self, store_name, report_date, path):
+        """Record a file this run downloaded"""
+        with self._lock:
+            self.downloaded_files.append(path)
+            self.results.setdefault('downloads', []).append({
+                'store': store_name,
+                'date': report_date.strftime('%Y-%m-%d'),
+                'path': path,
+            })
+
+    def add_converted(self, path):
+        """Record a file this run converted"""
+        with self._lock:
+            if path not in self.converted_files:
+                self.converted_files.append(path)
+
+    def foreign_files(self):
+        """Exports in the download folder that this run neither downloaded nor converted"""
+        if not self.downloads_folder:
+            return []
+        own = set(self.downloaded_files) | set(self.converted_files)
+        return [
+            path for path in sorted(glob.glob(os.path.join(self.downloads_folder, "*.xlsx")))
+            if path not in own and not Path(path).name.startswith("~$")
+        ]
+
+    def raw_files(self):
+        """
+        Raw files for the template update
+
+        The files this run downloaded if there are any, otherwise every
+        export in the run's download folder (unless the run only takes
+        fresh downloads).
+        """
+        if self.downloaded_files or self.fresh_downloads:
+            files = [path for path in self.downloaded_files if os.path.exists(path)]
+        else:
+            files = sorted(glob.glob(os.path.join(self.downloads_folder, "*.xlsx")))
+        return [
+            f for f in files
+            if not f.endswith('_transformed.xlsx') and not Path(f).name.startswith("~$")
+        ]
+
+    @contextlib.contextmanager
+    def timed(self, step):
+        """Time a step into self.timings"""
+        started = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.timings[step] = self.timings.get(step, 0.0) + time.time() - started
+
+    def __repr__(self):
+        return f"RunContext(name={self.name!r}, template={os.path.basename(self.template_path or '')!r})"
@@ -23,6 +23,8 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.common.keys import Keys
 from pathlib import Path
 
+from .context import RunContext
+
 # ========== CONFIGURATION ==========
 BASE_DIR = Path(__file__).resolve().parents[2]
 DATA_DIR = BASE_DIR / "data"
@@ -45,6 +47,8 @@ STORES = [
 
 # Default date: yesterday
 DEFAULT_DATE = datetime.now() - timedelta(days=1)
+
+DOWNLOAD_TIMEOUT = 60  # Seconds to wait for an export to land in the download folder
 # ===================================
 
 
@@ -81,6 +85,36 @@ def setup_chrome_driver(download_path=None):
     return driver
 
 
+def _export_files(download_path):
+    """Finished .xlsx exports in a download folder"""
+    return {
+        path for path in Path(download_path).glob("*.xlsx")
+        if not path.name.startswith("~$")
+    }
+
+
+def wait_for_download(download_path, before, timeout=DOWNLOAD_TIMEOUT):
+    """
+    Wait for a new export to appear in the download folder
+    
+    Args:
+        download_path: Folder Chrome downloads into
+        before: Set of files present before the export was clicked
+        timeout: Seconds to wait
+    
+    Returns:
+        Path of the new file, or None on timeout
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        new_files = _export_files(download_path) - before
+        partial = list(Path(download_path).glob("*.crdownload"))
+        if new_files and not partial:
+            return str(max(new_files, key=os.path.getmtime))
+        time.sleep(0.5)
+    return None
+
+
 def login_to_hmecloud(driver, username=USERNAME, password=PASSWORD):
     """Login to HMECloud - Two-step process"""
     
@@ -315,11 +349,13 @@ def navigate_to_reports(driver):
         return False
 
 
-def select_store_and_date(driver, store_name, report_date=None):
+def select_store_and_date(driver, store_name, report_date=None, ctx=None):
     """Select store from dropdown and date from calendar picker"""
     
+    if ctx is None:
+        ctx = RunContext.default(target_date=report_date)
     if report_date is None:
-        report_date = DEFAULT_DATE
+        report_date = ctx.target_date
     
     print(f"\n   📋 Selecting store and date...")
     print(f"      Store: {store_name}")
@@ -682,6 +718,7 @@ def select_store_and_date(driver, store_name, report_date=None):
                 print(f"      ❌ Could not find Microsoft Excel option in dropdown")
                 return False
             
+            before = _export_files(ctx.downloads_folder)
             try:
                 driver.execute_script("arguments[0].click();", excel_option)
                 print(f"      ✅ Clicked 'Microsoft Excel (.xlsx)' from dropdown")
@@ -690,22 +727,27 @@ def select_store_and_date(driver, store_name, report_date=None):
                 return False
             
             print(f"      ⏳ Waiting for download to complete...")
-            time.sleep(10)
+            downloaded_file = wait_for_download(ctx.downloads_folder, before)
+            if downloaded_file is None:
+                print(f"      ❌ No file arrived in {ctx.downloads_folder} within {DOWNLOAD_TIMEOUT}s")
+                return False
+            ctx.add_download(store_name, report_date, downloaded_file)
             print(f"      ✅ Download complete!")
-            print(f"      📥 Excel file saved to downloads folder")
+            print(f"      📥 Excel file saved: {os.path.basename(downloaded_file)}")
             
-            # Run DT macro on downloaded file
-            try:
-                from .run_macro import process_downloaded_file
-                print(f"\n      🔄 Running DT macro on downloaded file...")
-                macro_success = process_downloaded_file()
-                if macro_success:
-                    print(f"      ✅ File converted successfully!")
-                else:
-                    print(f"      ⚠️  Macro execution had issues, but file is downloaded")
-            except Exception as e:
-                print(f"      ⚠️  Could not run macro: {e}")
-                print(f"      📥 File downloaded but macro not executed")
+            # Run DT macro on downloaded file (in-memory runs read the raw export as is)
+            if not ctx.in_memory:
+                try:
+                    from .run_macro import process_downloaded_file
+                    print(f"\n      🔄 Running DT macro on downloaded file...")
+                    macro_success = process_downloaded_file(ctx=ctx, files=[downloaded_file])
+                    if macro_success:
+                        print(f"      ✅ File converted successfully!")
+                    else:
+                        print(f"      ⚠️  Macro execution had issues, but file is downloaded")
+                except Exception as e:
+                    print(f"      ⚠️  Could not run macro: {e}")
+                    print(f"      📥 File downloaded but macro not executed")
             
         except Exception as e:
             print(f"      ❌ Could not click View Report button: {e}")
@@ -745,24 +787,30 @@ def select_store_and_date(driver, store_name, report_date=None):
         return False
 
 
-def download_store_report(driver, store_name, report_date=None):
+def download_store_report(driver, store_name, report_date=None, ctx=None):
     """Download report for a specific store and date"""
     
+    if ctx is None:
+        ctx = RunContext.default(target_date=report_date)
     if report_date is None:
-        report_date = DEFAULT_DATE
+        report_date = ctx.target_date
     
     print(f"\n   📥 Downloading: {store_name}")
     print(f"      Date: {report_date.strftime('%Y-%m-%d')}")
     
-    downloads_dir = Path(DOWNLOADS_FOLDER)
-    if downloads_dir.exists():
-        existing_files = sorted(downloads_dir.glob("*.xlsx"))
+    downloads_dir = Path(ctx.downloads_folder)
+    if downloads_dir.exists() and not ctx.fresh_downloads:
+        # Only exports that predate this run - never the run's own downloads
+        existing_files = ctx.foreign_files()
+        if existing_files and ctx.in_memory:
+            print("   📁 Existing export found in downloads folder - using it as is")
+            return True
         if existing_files:
             print("   📁 Existing export found in downloads folder")
             try:
                 from .run_macro import process_downloaded_file
                 print("   🔄 Skipping new download and converting existing file...")
-                if process_downloaded_file(downloads_dir):
+                if process_downloaded_file(ctx=ctx, files=existing_files[-1:]):
                     print("   ✅ Existing file processed successfully")
                     return True
                 else:
@@ -775,7 +823,7 @@ def download_store_report(driver, store_name, report_date=None):
         wait = WebDriverWait(driver, 20)
         
         # Select store and date
-        if not select_store_and_date(driver, store_name, report_date):
+        if not select_store_and_date(driver, store_name, report_date, ctx=ctx):
             print(f"      ❌ Failed to select store/date for {store_name}")
             return False
         
@@ -838,17 +886,19 @@ def download_store_report(driver, store_name, report_date=None):
         return False
 
 
-def download_all_stores(stores=None, report_date=None, download_path=None):
+def download_all_stores(stores=None, report_date=None, download_path=None, ctx=None):
     """Download reports for all stores"""
     
+    if ctx is None:
+        ctx = RunContext.default(stores=stores, downloads_folder=download_path, target_date=report_date)
+    
     if stores is None:
-        stores = STORES
+        stores = ctx.stores
     
     if report_date is None:
-        report_date = DEFAULT_DATE
+        report_date = ctx.target_date
     
-    if download_path is None:
-        download_path = DOWNLOADS_FOLDER
+    download_path = ctx.downloads_folder
     
     print("\n" + "="*80)
     print("🍗 KFC GUYANA - HME CLOUD AUTOMATION")
@@ -858,14 +908,17 @@ def download_all_stores(stores=None, report_date=None, download_path=None):
     print(f"Download folder: {download_path}")
     print("="*80)
     
-    downloads_dir = Path(DOWNLOADS_FOLDER)
-    existing_files = list(downloads_dir.glob("*.xlsx"))
+    # Scheduled runs always download - an old export would pass for the new day
+    existing_files = [] if ctx.fresh_downloads else ctx.foreign_files()
+    if existing_files and ctx.in_memory:
+        print("\n   📁 Existing export detected in downloads folder - using it as is")
+        return True
     if existing_files:
         print("\n   📁 Existing export detected in downloads folder")
         try:
             from .run_macro import process_downloaded_file
             print("   🔄 Skipping new download and converting existing file...")
-            if process_downloaded_file(downloads_dir):
+            if process_downloaded_file(ctx=ctx, files=existing_files[-1:]):
                 print("   ✅ Existing file processed successfully")
                 return True
             else:
@@ -899,7 +952,9 @@ def download_all_stores(stores=None, report_date=None, download_path=None):
         for i, store in enumerate(stores, 1):
             print(f"\n[{i}/{len(stores)}]")
             
-            if download_store_report(driver, store, report_date):
+            with ctx.timed(f"download: {store}"):
+                downloaded = download_store_report(driver, store, report_date, ctx=ctx)
+            if downloaded:
                 successful_downloads += 1
             else:
                 failed_downloads.append(store)
@@ -937,14 +992,16 @@ def download_all_stores(stores=None, report_date=None, download_path=None):
         print("Browser closed.")
 
 
-def download_single_store(store_name, report_date=None, download_path=None):
+def download_single_store(store_name, report_date=None, download_path=None, ctx=None):
     """Download report for a single store"""
     
+    if ctx is None:
+        ctx = RunContext.default(downloads_folder=download_path, target_date=report_date)
+    
     if report_date is None:
-        report_date = DEFAULT_DATE
+        report_date = ctx.target_date
     
-    if download_path is None:
-        download_path = DOWNLOADS_FOLDER
+    download_path = ctx.downloads_folder
     
     print("\n" + "="*80)
     print("🍗 KFC GUYANA - SINGLE STORE DOWNLOAD")
@@ -968,7 +1025,7 @@ def download_single_store(store_name, report_date=None, download_path=None):
             return False
         
         # Download the store
-        success = download_store_report(driver, store_name, report_date)
+        success = download_store_report(driver, store_name, report_date, ctx=ctx)
         
         if success:
             print("\n" + "="*80)
@@ -0,0 +1,73 @@
+"""
+In-Memory Mode Module
+Hands downloads to the template update as buffers and DataFrames
+
+With RunContext(in_memory=True) nothing is written between the download
+and the template save:
+    - each export is read once into a BytesIO - no DT conversion in
+      place, no transform cache entry, no '_transformed.xlsx'
+    - frames are transformed in this process and go to the template
+      writer without being spooled
+    - the only files written are the template (with its journal, ledger
+      and high-water marks) and, optionally, the raw export moved into
+      an archive folder once it has been pasted
+
+USAGE:
+    python3 -m automation.complete_automation --in-memory
+    python3 -m automation.complete_automation --in-memory --archive data/archive
+"""
+
+import io
+import os
+import shutil
+import hashlib
+
+from .transform_data import transform_raw_car_data
+
+
+def load_buffer(path):
+    """Read an export into memory (the buffer's .name is the original path)"""
+    with open(path, 'rb') as f:
+        buffer = io.BytesIO(f.read())
+    buffer.name = path
+    return buffer
+
+
+def buffer_digest(buffer):
+    """SHA-256 of a buffer - same value as transform_cache.file_digest of the file"""
+    return hashlib.sha256(buffer.getbuffer()).hexdigest()
+
+
+def transform_buffers(buffers):
+    """
+    Transform in-memory exports in this process
+
+    Args:
+        buffers: Dict of {original path: BytesIO}
+
+    Returns:
+        List of DataFrames in input order (failed files are reported and skipped)
+    """
+    frames = []
+    for path, buffer in buffers.items():
+        try:
+            df = transform_raw_car_data(buffer)
+        except Exception as e:
+            print(f"   ❌ Error transforming {os.path.basename(path)}: {e}")
+            continue
+        df.attrs['source_file'] = path
+        frames.append(df)
+    return frames
+
+
+def archive_files(paths, archive_folder):
+    """
+    Move pasted exports into the archive folder
+
+    A rename when the folders share a file system - the data isn't rewritten.
+    """
+    os.makedirs(archive_folder, exist_ok=True)
+    for path in paths:
+        if os.path.exists(path):
+            shutil.move(path, os.path.join(archive_folder, os.path.basename(path)))
+            print(f"   🗄️  Archived: {os.path.basename(path)}")
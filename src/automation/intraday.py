@@ -0,0 +1,305 @@
+"""
+Intraday Module
+Near-real-time drive-thru times for the current day
+
+One Chrome session logs into HMECloud once and stays open. Every
+POLL_MINUTES it re-exports today's Raw Car Data for each store, reads the
+export straight into memory (no DT macro, no cache entry) and keeps only
+the events that departed since the previous poll - each store's newest
+departure is its high-water mark, and the events sharing that second are
+told apart by their ledger keys. The new events are appended to the day's
+event file and the live summary is rebuilt from the day so far.
+
+    data/live/<date>_events.csv     today's events, appended each poll
+    data/live/summary.json          per-store cars and average times
+
+The template is not touched - the daily run still pastes the full day the
+next morning.
+
+USAGE:
+    python3 -m automation.intraday                    # Poll every POLL_MINUTES
+    python3 -m automation.intraday --minutes 5
+    python3 -m automation.intraday --once             # One poll and exit
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import contextlib
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from . import hmecloud
+from .context import RunContext
+from .inmemory import load_buffer
+from .ledger import IngestLedger, StoreWatermarks, event_keys
+from .transform_data import transform_raw_car_data, to_typed_schema, OUTPUT_COLUMNS
+
+# ========== CONFIGURATION ==========
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_DIR = BASE_DIR / "data"
+INTRADAY_FOLDER = str((DATA_DIR / "downloads" / "intraday").resolve())  # Chrome downloads here; exports are deleted once read
+LIVE_DIR = str((DATA_DIR / "live").resolve())
+POLL_MINUTES = 10           # Minutes between polls (measured from the start of each poll)
+SUMMARY_TIMINGS = ['Greet', 'Service', 'Lane Queue', 'Lane Total']  # Averaged in the live summary
+# ===================================
+
+
+def events_path(day, live_dir=LIVE_DIR):
+    """Event file of a day"""
+    return os.path.join(live_dir, f"{day:%Y-%m-%d}_events.csv")
+
+
+def summary_path(live_dir=LIVE_DIR):
+    """Live summary file"""
+    return os.path.join(live_dir, "summary.json")
+
+
+def summarize(events, day, updated=None):
+    """
+    Per-store summary of the day so far
+
+    Args:
+        events: Typed DataFrame of the day's events (see to_typed_schema)
+        day: Report date
+        updated: Time of the poll that produced events
+
+    Returns:
+        Dict ready for JSON
+    """
+    def averages(frame):
+        return {
+            col: round(float(frame[col].mean()), 1) if col in frame and frame[col].notna().any() else None
+            for col in SUMMARY_TIMINGS
+        }
+
+    stores = {}
+    if len(events):
+        for store, frame in events.groupby('Store Name', observed=True):
+            last = frame['Departure Time'].max()
+            stores[str(store)] = {
+                'cars': int(len(frame)),
+                'last_departure': last.isoformat() if pd.notna(last) else None,
+                'average_seconds': averages(frame),
+                'dayparts': {
+                    str(daypart): int(count)
+                    for daypart, count in frame['Daypart'].value_counts(sort=False).items() if count
+                },
+            }
+
+    return {
+        'date': f"{day:%Y-%m-%d}",
+        'updated': (updated or datetime.now()).isoformat(timespec='seconds'),
+        'cars': int(len(events)),
+        'average_seconds': averages(events),
+        'stores': stores,
+    }
+
+
+class IntradayPoller:
+    """Re-export today for every store and keep a live summary of the new events"""
+
+    def __init__(self, ctx=None, minutes=POLL_MINUTES, live_dir=LIVE_DIR):
+        self.ctx = ctx or RunContext.default(
+            name='intraday', downloads_folder=INTRADAY_FOLDER, in_memory=True, fresh_downloads=True
+        )
+        self.minutes = minutes
+        self.live_dir = live_dir
+        self.driver = None
+        self.day = None
+        self._start_day(datetime.now())
+
+    # ----- the day's events -----
+
+    def _start_day(self, now):
+        """Reset to a new day, resuming from its event file if there is one"""
+        self.day = now.date()
+        self.marks = StoreWatermarks(None)      # In memory only - the event file is the record
+        self.ledger = IngestLedger(None)
+        self.events = to_typed_schema(pd.DataFrame(columns=OUTPUT_COLUMNS))
+
+        path = events_path(self.day, self.live_dir)
+        if os.path.exists(path):
+            df = pd.read_csv(path, dtype=str)
+            self._remember(df)
+            print(f"   📂 Resumed {len(df)} events already recorded today")
+
+    def _remember(self, df):
+        self.marks.update(df)
+        self.ledger.add(event_keys(df))
+        typed = to_typed_schema(df)
+        self.events = typed if self.events.empty else pd.concat([self.events, typed], ignore_index=True)
+
+    def ingest(self, df):
+        """
+        Keep the events of a full-day export that weren't seen before
+
+        Args:
+            df: Transformed DataFrame (the whole day so far for one store)
+
+        Returns:
+            DataFrame of the new events
+        """
+        tail, _ = self.marks.tail(df)
+        keys = event_keys(tail)
+        new = tail[~self.ledger.contains(keys)].reset_index(drop=True)
+        if new.empty:
+            return new
+
+        path = events_path(self.day, self.live_dir)
+        os.makedirs(self.live_dir, exist_ok=True)
+        new[OUTPUT_COLUMNS].to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+        self._remember(new)
+        return new
+
+    def write_summary(self):
+        """Rebuild the live summary atomically"""
+        path = summary_path(self.live_dir)
+        os.makedirs(self.live_dir, exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(summarize(self.events, self.day), f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    # ----- the HMECloud session -----
+
+    def open_session(self):
+        """
+        Log in and open the reports page (once per session)
+
+        Returns:
+            True if the session is ready
+        """
+        os.makedirs(self.ctx.downloads_folder, exist_ok=True)
+        # Leftovers of an interrupted poll would be taken for today's export
+        for path in glob.glob(os.path.join(self.ctx.downloads_folder, "*.xlsx")):
+            os.remove(path)
+
+        self.close_session()
+        self.driver = hmecloud.setup_chrome_driver(self.ctx.downloads_folder)
+        if hmecloud.login_to_hmecloud(self.driver) and hmecloud.navigate_to_reports(self.driver):
+            return True
+        self.close_session()
+        return False
+
+    def close_session(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+    def _export(self, store, report_date):
+        """Export one store's day into memory (the files are removed once read)"""
+        before = len(self.ctx.downloaded_files)
+        try:
+            exported = hmecloud.download_store_report(self.driver, store, report_date, ctx=self.ctx)
+            new_files = self.ctx.downloaded_files[before:]
+            buffer = load_buffer(new_files[-1]) if new_files else None
+        finally:
+            # Whatever happened, no export of this attempt is left for the next one
+            for path in self.ctx.downloaded_files[before:]:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+        return buffer if exported else None
+
+    def poll(self):
+        """
+        One pass over every store
+
+        Returns:
+            Number of new events
+        """
+        now = datetime.now()
+        if now.date() != self.day:
+            print(f"\n📅 New day - starting {now:%Y-%m-%d}")
+            self._start_day(now)
+        report_date = datetime.combine(self.day, datetime.min.time())
+
+        started = time.time()
+        total = 0
+        failed = []
+        for store in self.ctx.stores:
+            buffer = None
+            for attempt in range(2):
+                if self.driver is None and not self.open_session():
+                    break
+                try:
+                    buffer = self._export(store, report_date)
+                except Exception as e:
+                    print(f"      ❌ {store}: {e}")
+                if buffer is not None:
+                    break
+                if attempt == 0:
+                    # Session expired or the page is stuck - log in again and retry once
+                    print("      🔁 Reopening the HMECloud session...")
+                    self.close_session()
+            if buffer is None:
+                failed.append(store)
+                continue
+
+            try:
+                df = transform_raw_car_data(buffer)
+            except Exception as e:
+                print(f"      ❌ Error transforming {store}: {e}")
+                failed.append(store)
+                continue
+            new = self.ingest(df)
+            total += len(new)
+            print(f"      ➕ {store}: {len(new)} new of {len(df)} events today")
+
+        self.ctx.downloaded_files.clear()
+        self.write_summary()
+        print(f"\n   ⚡ Poll finished in {time.time() - started:.1f}s - {total} new events, "
+              f"{len(self.events)} today")
+        if failed:
+            print(f"   ⚠️  Not updated: {', '.join(failed)}")
+        return total
+
+    def run(self, once=False):
+        """Poll every self.minutes until interrupted"""
+        print("="*80)
+        print("⚡ INTRADAY DRIVE-THRU TIMES")
+        print("="*80)
+        print(f"Stores: {len(self.ctx.stores)}")
+        print(f"Every: {self.minutes} min")
+        print(f"Summary: {summary_path(self.live_dir)}")
+        print("="*80)
+        try:
+            while True:
+                started = time.time()
+                print(f"\n🕐 {datetime.now():%H:%M:%S} - polling")
+                self.poll()
+                if once:
+                    break
+                time.sleep(max(0.0, self.minutes * 60 - (time.time() - started)))
+        except KeyboardInterrupt:
+            print("\n🛑 Intraday polling stopped")
+        finally:
+            self.close_session()
+
+
+def main(argv=None):
+    """Command line interface"""
+    parser = argparse.ArgumentParser(description="Poll HMECloud for today's drive-thru times")
+    parser.add_argument("--minutes", type=float, default=POLL_MINUTES, help="Minutes between polls")
+    parser.add_argument("--stores", nargs="+", help="Store names (default: all stores)")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit")
+    args = parser.parse_args(argv)
+
+    # Every poll re-exports today - an earlier poll's file must never pass for it
+    ctx = RunContext.default(
+        name='intraday', stores=args.stores, downloads_folder=INTRADAY_FOLDER, in_memory=True,
+        fresh_downloads=True
+    )
+    IntradayPoller(ctx, minutes=args.minutes).run(once=args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Run Journal Module
+Write-ahead journal next to the template so an interrupted run can resume
+
+Every step of complete_automation that matters for recovery is appended
+to '<template>.journal' (one JSON record per line, fsync'd) before the
+run moves on:
+
+    begin     files consumed (with content hashes) and the template hash
+    stage     an in-memory step finished (transform, formulas, pivots, dates)
+    backup    backup path taken for this run
+    pasted    sheet and row range pasted for each file
+    saving    hash of the fully written new template, just before it is swapped in
+    saved     the new template is in place
+    commit    run finished
+
+A rerun reads the journal first: files already pasted by a finished run
+are not pasted again, a save that landed without its 'saved' record is
+completed, and the backup of an interrupted run is reused.
+"""
+
+import os
+import json
+import uuid
+from datetime import datetime
+
+from .transform_cache import file_digest
+from .xlsx_access import release
+
+JOURNAL_SUFFIX = '.journal'
+
+
+def journal_path(template_path):
+    """Journal file for a template"""
+    return str(template_path) + JOURNAL_SUFFIX
+
+
+class RunJournal:
+    """Append-only journal of automation runs against one template"""
+
+    def __init__(self, template_path, path=None):
+        self.template_path = str(template_path)
+        self.path = path or journal_path(template_path)
+        self.records = self._load()
+        self.run_id = None
+
+    def _load(self):
+        """Read all complete records (a torn last line from a crash is dropped)"""
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+        return records
+
+    def append(self, event, **fields):
+        """Durably append one record"""
+        record = {
+            'run': fields.pop('run', self.run_id),
+            'event': event,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            **fields,
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.records.append(record)
+        return record
+
+    def _runs(self):
+        """Records grouped by run, in journal order"""
+        runs = {}
+        for record in self.records:
+            runs.setdefault(record['run'], []).append(record)
+        return runs
+
+    def _template_digest(self):
+        return file_digest(self.template_path) if os.path.exists(self.template_path) else None
+
+    def recover(self):
+        """
+        Settle the last run if it was interrupted
+
+        Returns:
+            Dict describing the last run: status is 'none', 'committed' or
+            'interrupted'; an interrupted run with an intact template also
+            carries its 'backup' path for reuse
+        """
+        runs = self._runs()
+        if not runs:
+            return {'status': 'none'}
+
+        run_id, records = list(runs.items())[-1]
+        events = {record['event']: record for record in records}
+        if 'commit' in events:
+            return {'status': 'committed', 'run': run_id}
+        if 'abandoned' in events:
+            return {'status': 'none', 'run': run_id}
+
+        current = self._template_digest()
+
+        # Crashed between swapping in the new template and journaling it
+        if 'saving' in events and current == events['saving']['digest']:
+            if 'saved' not in events:
+                self.append('saved', run=run_id, digest=current, recovered=True)
+            self.append('commit', run=run_id, recovered=True)
+            print(f"   ♻️  Journal: run {run_id} had saved the template - marked complete")
+            return {'status': 'committed', 'run': run_id}
+
+        info = {'status': 'interrupted', 'run': run_id, 'stages': [r['event'] for r in records]}
+        begin = events.get('begin')
+        backup = events.get('backup')
+        if begin and backup and current == begin['template_digest'] and os.path.exists(backup['path']):
+            info['backup'] = backup['path']
+        print(f"   ⚠️  Journal: run {run_id} was interrupted after '{records[-1]['event']}' - resuming")
+        return info
+
+    def consumed_files(self):
+        """
+        Files pasted by finished runs
+
+        Returns:
+            Dict of {content hash: pasted record for that file}
+        """
+        consumed = {}
+        for records in self._runs().values():
+            events = [record['event'] for record in records]
+            if 'saved' not in events:
+                continue
+            for record in records:
+                if record['event'] == 'pasted':
+                    for entry in record['files']:
+                        if entry.get('partial'):
+                            continue
+                        consumed[entry['digest']] = dict(entry, sheet=record['sheet'], run=record['run'])
+        return consumed
+
+    def begin(self, files, target_date, resumes=None):
+        """
+        Start a run
+
+        Args:
+            files: Dict of {path: content hash} about to be consumed
+            target_date: Report date of the run
+            resumes: Id of the interrupted run this one replaces
+
+        Returns:
+            Run id
+        """
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S_') + uuid.uuid4().hex[:6]
+        if resumes is not None:
+            self.append('abandoned', run=resumes, resumed_by=self.run_id)
+        self.append(
+            'begin',
+            files=[{'path': path, 'digest': digest} for path, digest in files.items()],
+            template_digest=self._template_digest(),
+            target_date=target_date.strftime('%Y-%m-%d'),
+        )
+        return self.run_id
+
+    def stage(self, name, **fields):
+        """Record a completed in-memory step"""
+        self.append('stage', stage=name, **fields)
+
+    def backup(self, backup_path):
+        self.append('backup', path=backup_path)
+
+    def pasted(self, sheet, ranges, partial=()):
+        """
+        Record the rows pasted for each file
+
+        Args:
+            sheet: Target sheet name
+            ranges: List of (path, digest, first_row, last_row)
+            partial: Paths only partly pasted (e.g. rows outside a date range) -
+                these are not treated as consumed by later runs
+        """
+        self.append('pasted', sheet=sheet, files=[
+            {'path': path, 'digest': digest, 'first_row': first, 'last_row': last, 'partial': path in partial}
+            for path, digest, first, last in ranges
+        ])
+
+    def saving(self, temp_path):
+        """Record the hash of the new template before it replaces the old one"""
+        self.append('saving', digest=file_digest(temp_path))
+        # The temp file is renamed over the template next - drop its mapping
+        release(temp_path)
+
+    def saved(self):
+        self.append('saved', digest=self._template_digest())
+
+    def commit(self):
+        self.append('commit')
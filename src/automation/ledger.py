@@ -0,0 +1,296 @@
+"""
+Ingestion Ledger Module
+Remembers every (store, departure time, event) already pasted into the template
+
+The ledger sits next to the template as '<template>.ledger.npz' and holds:
+    - a sorted array of 64-bit key hashes (exact index, binary search)
+    - a Bloom filter over the same hashes (fast negative lookups)
+
+Next to it, '<template>.watermarks.json' keeps each store's newest
+Departure Time already in the template. Rows older than their store's
+mark are dropped before any hashing, so a re-download of an overlapping
+period only carries its new tail forward - without reading AllStores.
+
+New frames are checked in one vectorized pass: rows the Bloom filter
+rejects are new without touching the index; only Bloom hits are
+confirmed against the sorted hashes. A re-downloaded day therefore
+drops out before paste_to_template instead of being appended again.
+"""
+
+import io
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from .transform_data import parse_departure_times
+from .xlsx_access import open_stream
+
+# ========== CONFIGURATION ==========
+LEDGER_SUFFIX = '.ledger.npz'
+WATERMARK_SUFFIX = '.watermarks.json'
+KEY_COLUMNS = ['Store Name', 'Departure Time', 'Event Name']
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+BLOOM_HASHES = 7
+BLOOM_MIN_CAPACITY = 100_000        # Keys before the filter is resized
+# ===================================
+
+
+def ledger_path(template_path):
+    """Ledger file for a template"""
+    return str(template_path) + LEDGER_SUFFIX
+
+
+def watermark_path(template_path):
+    """Store high-water-mark file for a template"""
+    return str(template_path) + WATERMARK_SUFFIX
+
+
+def event_keys(df):
+    """
+    64-bit hash of each row's (Store Name, Departure Time, Event Name)
+
+    Departure times are normalized to ISO text, so the same event read as
+    a string, a datetime or from the template yields the same key.
+    """
+    departure = df['Departure Time']
+    parsed = parse_departure_times(departure)
+    departure = parsed.dt.strftime('%Y-%m-%d %H:%M:%S').where(parsed.notna(), departure.astype(str))
+
+    keys = pd.DataFrame({
+        'store': df['Store Name'].astype(str).str.strip(),
+        'departure': departure.astype(str),
+        'event': df['Event Name'].astype(str).str.strip(),
+    })
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+
+def _bloom_size(capacity):
+    """Bits needed for capacity keys at BLOOM_FALSE_POSITIVE_RATE"""
+    bits = int(-capacity * np.log(BLOOM_FALSE_POSITIVE_RATE) / (np.log(2) ** 2))
+    return max(64, bits)
+
+
+def _bloom_positions(keys, n_bits):
+    """Bit positions of each key (double hashing), shape (len(keys), BLOOM_HASHES)"""
+    h1 = keys
+    h2 = (keys >> np.uint64(32)) | np.uint64(1)
+    rounds = np.arange(BLOOM_HASHES, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        return (h1[:, None] + rounds[None, :] * h2[:, None]) % np.uint64(n_bits)
+
+
+class IngestLedger:
+    """Persistent set of ingested event keys with a Bloom filter in front"""
+
+    def __init__(self, path, keys=None):
+        self.path = path
+        self.keys = np.unique(keys if keys is not None else np.empty(0, dtype=np.uint64))
+        self._build_bloom(max(BLOOM_MIN_CAPACITY, 2 * len(self.keys)))
+
+    @classmethod
+    def load(cls, path):
+        """Load a ledger (empty if the file doesn't exist)"""
+        if not os.path.exists(path):
+            return cls(path)
+        with np.load(path) as data:
+            ledger = cls.__new__(cls)
+            ledger.path = path
+            ledger.keys = data['keys']
+            ledger.capacity = int(data['capacity'])
+            ledger.bloom = data['bloom']
+        return ledger
+
+    @classmethod
+    def for_template(cls, template_path, sheet=None):
+        """
+        Ledger of a template, seeded from the sheet's existing rows on first use
+
+        Args:
+            template_path: Path to Drive Thru template
+            sheet: Data sheet to seed from (e.g. 'AllStores')
+        """
+        path = ledger_path(template_path)
+        if os.path.exists(path) or sheet is None:
+            return cls.load(path)
+
+        ledger = cls(path)
+        try:
+            existing = pd.read_excel(open_stream(template_path), sheet_name=sheet, usecols='B:D', header=None)
+            existing.columns = KEY_COLUMNS
+            existing = existing[existing['Event Name'].notna()]
+            ledger.add(event_keys(existing))
+            print(f"   📒 Ledger seeded with {len(ledger)} events already in '{sheet}'")
+        except Exception as e:
+            print(f"   ⚠️  Could not seed ledger from '{sheet}': {e}")
+        return ledger
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _build_bloom(self, capacity):
+        self.capacity = capacity
+        n_bits = _bloom_size(capacity)
+        self.bloom = np.zeros((n_bits + 7) // 8, dtype=np.uint8)
+        self._set_bits(self.keys)
+
+    def _n_bits(self):
+        return len(self.bloom) * 8
+
+    def _set_bits(self, keys):
+        if len(keys) == 0:
+            return
+        bits = np.zeros(self._n_bits(), dtype=bool)
+        bits[_bloom_positions(keys, self._n_bits()).ravel()] = True
+        self.bloom |= np.packbits(bits, bitorder='little')
+
+    def _maybe_contains(self, keys):
+        positions = _bloom_positions(keys, self._n_bits())
+        bits = (self.bloom[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def contains(self, keys):
+        """Boolean array: which keys are already in the ledger"""
+        keys = np.asarray(keys, dtype=np.uint64)
+        found = np.zeros(len(keys), dtype=bool)
+        if len(keys) == 0 or len(self.keys) == 0:
+            return found
+
+        candidates = np.flatnonzero(self._maybe_contains(keys))
+        if len(candidates):
+            hits = keys[candidates]
+            slots = np.searchsorted(self.keys, hits)
+            slots[slots == len(self.keys)] = 0
+            found[candidates] = self.keys[slots] == hits
+        return found
+
+    def add(self, keys):
+        """Add keys (the Bloom filter is rebuilt larger when it fills up)"""
+        keys = np.unique(np.asarray(keys, dtype=np.uint64))
+        keys = keys[~self.contains(keys)]
+        if len(keys) == 0:
+            return
+        # Both sides are sorted - a stable sort just merges the two runs
+        merged = np.concatenate([self.keys, keys])
+        merged.sort(kind='stable')
+        self.keys = merged
+        if len(self.keys) > self.capacity:
+            self._build_bloom(2 * len(self.keys))
+        else:
+            self._set_bits(keys)
+
+    def save(self):
+        """Write the ledger atomically"""
+        buffer = io.BytesIO()
+        np.savez(buffer, keys=self.keys, bloom=self.bloom, capacity=self.capacity)
+        with open(self.path + '.tmp', 'wb') as f:
+            f.write(buffer.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + '.tmp', self.path)
+
+
+class StoreWatermarks:
+    """Newest Departure Time already ingested, per store"""
+
+    def __init__(self, path, marks=None):
+        self.path = path
+        self.marks = dict(marks or {})      # Store name -> pd.Timestamp
+
+    @classmethod
+    def load(cls, path):
+        """Load the marks (empty if the file doesn't exist)"""
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, encoding='utf-8') as f:
+            marks = json.load(f)
+        return cls(path, {store: pd.Timestamp(value) for store, value in marks.items()})
+
+    @classmethod
+    def for_template(cls, template_path, sheet=None):
+        """
+        Marks of a template, seeded from the sheet's existing rows on first use
+
+        Args:
+            template_path: Path to Drive Thru template
+            sheet: Data sheet to seed from (e.g. 'AllStores')
+        """
+        path = watermark_path(template_path)
+        if os.path.exists(path) or sheet is None:
+            return cls.load(path)
+
+        marks = cls(path)
+        try:
+            existing = pd.read_excel(open_stream(template_path), sheet_name=sheet, usecols='B:C', header=None)
+            existing.columns = KEY_COLUMNS[:2]
+            marks.update(existing[existing['Store Name'].notna()])
+            print(f"   📒 High-water marks seeded for {len(marks.marks)} stores from '{sheet}'")
+        except Exception as e:
+            print(f"   ⚠️  Could not seed high-water marks from '{sheet}': {e}")
+        return marks
+
+    def _departures(self, df):
+        stores = df['Store Name'].astype(str).str.strip()
+        return stores, parse_departure_times(df['Departure Time'])
+
+    def tail(self, df, inclusive=True):
+        """
+        Keep rows at or after their store's mark
+
+        Args:
+            df: Transformed DataFrame
+            inclusive: Keep rows departing exactly at the mark (several
+                events can share a second - pair with the ledger to drop
+                the ones already pasted)
+
+        Returns:
+            Tuple of (DataFrame of the tail, number of rows dropped)
+        """
+        if not self.marks:
+            return df, 0
+        stores, departures = self._departures(df)
+        marks = pd.to_datetime(stores.map(self.marks))
+        newer = departures >= marks if inclusive else departures > marks
+        # Unknown stores and unparsable times can't be compared - keep them
+        keep = (marks.isna() | departures.isna() | newer).to_numpy()
+        if keep.all():
+            return df, 0
+
+        tail = df[keep].reset_index(drop=True)
+        tail.attrs = dict(df.attrs)
+        return tail, int((~keep).sum())
+
+    def update(self, df):
+        """Raise each store's mark to the newest departure in df"""
+        stores, departures = self._departures(df)
+        newest = departures.groupby(stores).max().dropna()
+        for store, departure in newest.items():
+            if store not in self.marks or departure > self.marks[store]:
+                self.marks[store] = departure
+
+    def save(self):
+        """Write the marks atomically"""
+        marks = {store: mark.isoformat() for store, mark in sorted(self.marks.items())}
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(marks, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + '.tmp', self.path)
+
+
+def filter_new_rows(df, ledger):
+    """
+    Drop rows whose event key is already in the ledger
+
+    Returns:
+        Tuple of (DataFrame of new rows, their keys, number of rows dropped)
+    """
+    keys = event_keys(df)
+    seen = ledger.contains(keys)
+    if not seen.any():
+        return df, keys, 0
+
+    new_rows = df[~seen].reset_index(drop=True)
+    new_rows.attrs = dict(df.attrs)
+    return new_rows, keys[~seen], int(seen.sum())
@@ -0,0 +1,445 @@
+"""
+Pipeline Module
+Runs the daily workflow as declared stages and skips stages whose inputs are unchanged
+
+Each stage names the artifacts it reads and writes. Before a stage runs,
+a fingerprint of its inputs is compared with the one recorded on the
+last run; if nothing changed the stage is skipped and its saved outputs
+are reused. Re-running after fixing one download only repeats the
+stages that depend on it.
+
+The template is updated by a single 'update' stage that goes through
+complete_automation.update_template - the same template writer, journal,
+ingest ledger and high-water marks as every other run - so new rows are
+always pasted onto the current template, and rows already in it are
+never pasted twice.
+
+USAGE:
+    python3 -m automation.pipeline                    # Use files already in downloads/
+    python3 -m automation.pipeline --download         # Download from HMECloud first
+    python3 -m automation.pipeline --force transform  # Re-run a stage (and everything after it)
+"""
+
+import os
+import sys
+import json
+import glob
+import pickle
+import hashlib
+import argparse
+import functools
+from datetime import datetime
+from pathlib import Path
+
+from .transform_cache import file_digest
+from .transform_data import detect_layout
+from .xlsx_access import release_all
+from .context import RunContext
+from .complete_automation import DOWNLOADS_FOLDER, transform_files, update_template
+
+# ========== CONFIGURATION ==========
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_DIR = BASE_DIR / "data"
+PIPELINE_DIR = str((DATA_DIR / "cache" / "pipeline").resolve())
+CONVERT_WITH_DT_MACRO = False  # Raw exports are read directly; True runs the DT macro on them first
+# ===================================
+
+STATE_FILE = 'state.json'
+
+
+def stage(name, run, inputs=(), files=(), outputs=(), file_outputs=(), transient=()):
+    """
+    Declare a pipeline stage
+
+    Args:
+        name: Stage name
+        run: Callable taking the input artifacts as keyword arguments and
+            returning a dict of output artifacts
+        inputs: Artifacts fingerprinted by value
+        files: Artifacts holding a path or list of paths, fingerprinted by content
+        outputs: Value outputs saved for reuse when the stage is skipped
+        file_outputs: Outputs holding paths the stage wrote
+        transient: Outputs that can't be saved (e.g. an open workbook) -
+            the stage re-runs whenever a later stage needs them
+
+    Returns:
+        Stage dict for run_pipeline
+    """
+    return {
+        'name': name,
+        'run': run,
+        'inputs': list(inputs),
+        'files': list(files),
+        'outputs': list(outputs),
+        'file_outputs': list(file_outputs),
+        'transient': list(transient),
+    }
+
+
+def _hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _as_paths(value):
+    """A path artifact as a list of paths"""
+    if value is None:
+        return []
+    if isinstance(value, (str, os.PathLike)):
+        return [str(value)]
+    return [str(path) for path in value]
+
+
+def state_dir(template_path):
+    """
+    Pipeline state directory for a template
+
+    Each template (profile) keeps its own fingerprints and saved outputs,
+    so runs for different templates don't invalidate each other's stages.
+    """
+    key = hashlib.sha256(os.path.realpath(template_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(PIPELINE_DIR, f"{Path(template_path).stem}_{key}")
+
+
+def load_state(pipeline_dir=PIPELINE_DIR):
+    """Load the recorded fingerprints of the last run"""
+    path = os.path.join(pipeline_dir, STATE_FILE)
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️  Ignoring unreadable pipeline state: {e}")
+    return {'stages': {}}
+
+
+def save_state(state, pipeline_dir=PIPELINE_DIR):
+    """Write the pipeline state atomically"""
+    os.makedirs(pipeline_dir, exist_ok=True)
+    path = os.path.join(pipeline_dir, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+class Pipeline:
+    """One run of a list of stages against the recorded state"""
+
+    def __init__(self, stages, artifacts, pipeline_dir=PIPELINE_DIR, force=()):
+        self.stages = {s['name']: s for s in stages}
+        self.order = [s['name'] for s in stages]
+        self.producers = {
+            output: s['name']
+            for s in stages
+            for output in s['outputs'] + s['file_outputs'] + s['transient']
+        }
+        self.artifacts = dict(artifacts)
+        self.fingerprints = {}
+        self.pipeline_dir = pipeline_dir
+        self.state = load_state(pipeline_dir)
+        self.force = set(force)
+        self.ran = []
+        self.skipped = []
+
+    def _file_fingerprint(self, path):
+        """Content fingerprint of an input file"""
+        if not os.path.exists(path):
+            return _hash('missing', path)
+        return file_digest(path)
+
+    def _artifact_fingerprint(self, name, as_files):
+        if name in self.fingerprints:
+            return self.fingerprints[name]
+        value = self.artifacts[name]
+        if as_files:
+            fingerprint = _hash(*[(path, self._file_fingerprint(path)) for path in _as_paths(value)])
+        else:
+            fingerprint = _hash(repr(value))
+        self.fingerprints[name] = fingerprint
+        return fingerprint
+
+    def stage_fingerprint(self, name):
+        """Fingerprint of a stage's inputs"""
+        s = self.stages[name]
+        return _hash(
+            name,
+            *[(inp, self._artifact_fingerprint(inp, False)) for inp in s['inputs']],
+            *[(inp, self._artifact_fingerprint(inp, True)) for inp in s['files']],
+        )
+
+    def _outputs_path(self, name):
+        return os.path.join(self.pipeline_dir, f"{name}.pkl")
+
+    def _load_outputs(self, name, fingerprint):
+        """Saved outputs of a stage, or None if they can't be reused"""
+        s = self.stages[name]
+        record = self.state['stages'].get(name)
+        if name in self.force or not record or record['fingerprint'] != fingerprint:
+            return None
+
+        outputs = {}
+        if s['outputs'] or s['file_outputs']:
+            try:
+                with open(self._outputs_path(name), 'rb') as f:
+                    outputs = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                return None
+
+        for output in s['file_outputs']:
+            for path in _as_paths(outputs.get(output)):
+                if not os.path.exists(path) or file_digest(path) != record['files'].get(path):
+                    return None
+
+        return outputs
+
+    def _run_stage(self, name, fingerprint):
+        s = self.stages[name]
+        for inp in s['inputs'] + s['files']:
+            self._require(inp)
+
+        print(f"\n▶️  Stage: {name}")
+        kwargs = {inp: self.artifacts[inp] for inp in s['inputs'] + s['files']}
+        outputs = s['run'](**kwargs) or {}
+
+        missing = [o for o in s['outputs'] + s['file_outputs'] + s['transient'] if o not in outputs]
+        if missing:
+            raise RuntimeError(f"Stage '{name}' did not produce: {', '.join(missing)}")
+
+        saved = {o: outputs[o] for o in s['outputs'] + s['file_outputs']}
+        if saved:
+            os.makedirs(self.pipeline_dir, exist_ok=True)
+            with open(self._outputs_path(name), 'wb') as f:
+                pickle.dump(saved, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        written_files = {}
+        for output in s['file_outputs']:
+            for path in _as_paths(outputs[output]):
+                written_files[path] = file_digest(path)
+
+        self.state['stages'][name] = {
+            'fingerprint': fingerprint,
+            'files': written_files,
+            'finished': datetime.now().isoformat(timespec='seconds'),
+        }
+        save_state(self.state, self.pipeline_dir)
+        if name in self.skipped:
+            self.skipped.remove(name)
+        self.ran.append(name)
+        return outputs
+
+    def _require(self, artifact):
+        """Make sure an artifact is in memory, re-running its stage if it was transient"""
+        if artifact in self.artifacts:
+            return
+        producer = self.producers.get(artifact)
+        if producer is None:
+            raise KeyError(f"No stage produces '{artifact}'")
+        print(f"   ↩️  '{artifact}' is not cached - re-running '{producer}'")
+        fingerprint = self.stage_fingerprint(producer)
+        self._publish(producer, fingerprint, self._run_stage(producer, fingerprint))
+
+    def _publish(self, name, fingerprint, outputs):
+        """Add a stage's outputs to the artifacts with derived fingerprints"""
+        s = self.stages[name]
+        for output in s['outputs'] + s['file_outputs'] + s['transient']:
+            if output in outputs:
+                self.artifacts[output] = outputs[output]
+            if output not in s['file_outputs']:
+                # Values are identified by the inputs that produced them
+                self.fingerprints[output] = _hash(fingerprint, output)
+        if name in self.force:
+            self.force.update(self.order[self.order.index(name) + 1:])
+
+    def run(self):
+        """
+        Run every stage whose inputs changed
+
+        Returns:
+            Dict of all artifacts after the run
+        """
+        for name in self.order:
+            fingerprint = self.stage_fingerprint(name)
+            outputs = self._load_outputs(name, fingerprint)
+            if outputs is None:
+                outputs = self._run_stage(name, fingerprint)
+            else:
+                print(f"\n⏭️  Stage: {name} (inputs unchanged)")
+                self.skipped.append(name)
+            self._publish(name, fingerprint, outputs)
+
+        return self.artifacts
+
+
+def run_pipeline(stages, artifacts, pipeline_dir=PIPELINE_DIR, force=()):
+    """
+    Run stages in order, skipping those whose inputs are unchanged
+
+    Args:
+        stages: List of stage() dicts, in dependency order
+        artifacts: Initial artifacts (configuration, input paths)
+        pipeline_dir: Where fingerprints and saved outputs are kept
+        force: Stage names to re-run regardless (later stages follow)
+
+    Returns:
+        Pipeline object (artifacts, ran and skipped stage lists)
+    """
+    pipeline = Pipeline(stages, artifacts, pipeline_dir, force)
+    pipeline.run()
+    return pipeline
+
+
+# ========== DAILY WORKFLOW STAGES ==========
+
+def _stage_download(report_date, stores, downloads_folder):
+    from .hmecloud import download_all_stores
+    download_all_stores(stores=stores, report_date=report_date, download_path=downloads_folder)
+    return {'raw_files': find_raw_files(downloads_folder)}
+
+
+def _stage_convert(raw_files):
+    """Route each download by layout - raw and DT-converted files both feed the transform"""
+    converted = []
+    for raw_file in raw_files:
+        layout = detect_layout(raw_file)
+        if layout['name'] == 'unknown':
+            print(f"   ⚠️  Skipping {os.path.basename(raw_file)}: not a Raw Car Data export")
+            continue
+        if layout['name'] == 'raw' and CONVERT_WITH_DT_MACRO:
+            from .run_macro import run_dt_macro
+            if not run_dt_macro(raw_file):
+                print(f"   ⚠️  DT macro failed for {os.path.basename(raw_file)} - using raw layout")
+        print(f"   ✅ {os.path.basename(raw_file)}: {layout['name']}")
+        converted.append(raw_file)
+    return {'converted_files': converted}
+
+
+def _stage_transform(ctx, converted_files):
+    frames = transform_files(converted_files, jobs=ctx.transform_jobs)
+    if not frames:
+        raise RuntimeError("No data transformed successfully")
+    return {'frames': frames}
+
+
+def _stage_update(ctx, frames, **_config):
+    # Dates, sheet, formula columns and date cells are read from ctx - they
+    # are declared as inputs so that changing one re-runs the update
+    file_digests = {df.attrs['source_file']: file_digest(df.attrs['source_file']) for df in frames}
+    result = update_template(ctx, frames, file_digests)
+    if not result['success']:
+        raise RuntimeError(f"Template update failed: {result.get('error', 'unknown error')}")
+    return {'rows_added': result['rows_added'], 'template_saved': ctx.template_path}
+
+
+def daily_stages(ctx, download=False):
+    """
+    Stages of the daily workflow (download is optional)
+
+    The update stage re-runs whenever its frames or settings change, or
+    when the template was saved by anyone else since - pasting is
+    idempotent, so a re-run only adds rows the template doesn't have.
+    """
+    stages = []
+    if download:
+        stages.append(stage('download', _stage_download,
+                            inputs=['report_date', 'stores', 'downloads_folder'],
+                            file_outputs=['raw_files']))
+    stages += [
+        stage('convert', _stage_convert, files=['raw_files'], file_outputs=['converted_files']),
+        stage('transform', functools.partial(_stage_transform, ctx), files=['converted_files'], outputs=['frames']),
+        stage('update', functools.partial(_stage_update, ctx),
+              inputs=['frames', 'target_date', 'target_sheet', 'formula_columns', 'date_configs', 'template_path'],
+              outputs=['rows_added'], file_outputs=['template_saved']),
+    ]
+    return stages
+
+
+def find_raw_files(downloads_folder=DOWNLOADS_FOLDER):
+    """Raw exports in the downloads folder (same rule as complete_automation)"""
+    raw_files = sorted(glob.glob(os.path.join(downloads_folder, "*.xlsx")))
+    return [
+        f for f in raw_files
+        if not f.endswith('_transformed.xlsx') and not os.path.basename(f).startswith('~$')
+    ]
+
+
+def run_daily_pipeline(report_date=None, download=False, force=(), pipeline_dir=None, ctx=None):
+    """
+    Run the daily workflow, skipping stages whose inputs are unchanged
+
+    Args:
+        report_date: Date written to the report sheets (default: yesterday)
+        download: Download from HMECloud first
+        force: Stage names to re-run regardless
+        pipeline_dir: Where fingerprints and saved outputs are kept
+            (default: the template's directory under PIPELINE_DIR)
+        ctx: RunContext with the template, sheet and folders (default: module configuration)
+
+    Returns:
+        True if the run completed
+    """
+    if ctx is None:
+        ctx = RunContext.default(target_date=report_date)
+    report_date = report_date or ctx.target_date
+    # Whole day, so the date fingerprint doesn't change with the clock
+    report_date = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    ctx.target_date, ctx.start_date = report_date, None
+    if pipeline_dir is None:
+        pipeline_dir = state_dir(ctx.template_path)
+
+    print("="*80)
+    print("🍗 KFC GUYANA - DRIVE-THRU PIPELINE")
+    print("="*80)
+    print(f"Target date: {report_date.strftime('%B %d, %Y')}")
+    print("="*80)
+
+    artifacts = {
+        'report_date': report_date,
+        'stores': list(ctx.stores),
+        'downloads_folder': ctx.downloads_folder,
+        'template_path': ctx.template_path,
+        'target_sheet': ctx.target_sheet,
+        'formula_columns': list(ctx.formula_columns),
+        'target_date': report_date,
+        'date_configs': dict(ctx.date_configs),
+    }
+    if not download:
+        artifacts['raw_files'] = find_raw_files(ctx.downloads_folder)
+        if not artifacts['raw_files']:
+            print("\n❌ No files found in downloads/ folder!")
+            print(f"   Please download Raw Car Data files to: {ctx.downloads_folder}")
+            return False
+
+    try:
+        pipeline = run_pipeline(daily_stages(ctx, download), artifacts, pipeline_dir, force)
+    except Exception as e:
+        print(f"\n❌ Pipeline failed: {e}")
+        return False
+    finally:
+        release_all()
+
+    print("\n" + "="*80)
+    print("✅ PIPELINE COMPLETE")
+    print("="*80)
+    print(f"   Ran: {', '.join(pipeline.ran) or 'nothing (all inputs unchanged)'}")
+    print(f"   Skipped: {', '.join(pipeline.skipped) or 'none'}")
+    return True
+
+
+def main(argv=None):
+    """Command line interface"""
+    parser = argparse.ArgumentParser(description="Run the drive-thru workflow as a cached stage pipeline")
+    parser.add_argument("--download", action="store_true", help="Download from HMECloud first")
+    parser.add_argument("--date", help="Report date (YYYY-MM-DD, default: yesterday)")
+    parser.add_argument("--force", action="append", default=[], help="Re-run this stage and all later ones")
+    args = parser.parse_args(argv)
+
+    report_date = datetime.strptime(args.date, "%Y-%m-%d") if args.date else None
+    success = run_daily_pipeline(report_date, download=args.download, force=args.force)
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Run Profiles Module
+Runs the drive-thru flow for several markets at once, one worker process per profile
+
+A profile bundles everything that differs between markets: template,
+data sheet, store list, download folder, formula columns and date cells.
+The built-in 'guyana' profile uses the module constants; more markets are
+added in data/profiles.json without code changes:
+
+    {
+        "trinidad": {
+            "template_path": "templates/Drive Thru Optimization - KFC Trinidad.xlsx",
+            "stores": ["(Ungrouped) Frederick Street - KFC"],
+            "downloads_folder": "downloads/trinidad",
+            "date_configs": {"Summary - Stores": "B1"}
+        }
+    }
+
+Every profile needs its own template_path, downloads_folder and stores -
+two profiles sharing a template or a download folder would paste each
+other's exports. Other missing keys fall back to the 'guyana' profile;
+relative paths are resolved against data/.
+
+USAGE:
+    python3 -m automation.profiles                      # Every profile, in parallel
+    python3 -m automation.profiles --profile trinidad   # One profile
+    python3 -m automation.profiles --download           # Download from HMECloud first
+    python3 -m automation.profiles --list               # Show configured profiles
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import hmecloud
+from . import complete_automation
+from .context import RunContext
+
+# ========== CONFIGURATION ==========
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_DIR = BASE_DIR / "data"
+PROFILES_FILE = str((DATA_DIR / "profiles.json").resolve())
+LOGS_DIR = str((DATA_DIR / "logs").resolve())
+PROFILE_JOBS = None  # Profiles run at once (None = all of them)
+# ===================================
+
+PROFILE_KEYS = [
+    'template_path',
+    'target_sheet',
+    'stores',
+    'downloads_folder',
+    'formula_columns',
+    'date_configs',
+]
+PATH_KEYS = ['template_path', 'downloads_folder']
+REQUIRED_KEYS = ['template_path', 'downloads_folder', 'stores']
+
+
+def default_profile():
+    """The built-in profile, taken from the module configuration"""
+    return {
+        'name': 'guyana',
+        'template_path': complete_automation.TEMPLATE_PATH,
+        'target_sheet': complete_automation.TARGET_SHEET,
+        'stores': list(hmecloud.STORES),
+        'downloads_folder': complete_automation.DOWNLOADS_FOLDER,
+        'formula_columns': list(complete_automation.FORMULA_COLUMNS),
+        'date_configs': dict(complete_automation.DATE_CONFIGS),
+    }
+
+
+def load_profiles(profiles_file=PROFILES_FILE):
+    """
+    Load all run profiles
+
+    Returns:
+        Dict of {profile name: profile dict}, built-in profile first
+
+    Raises:
+        ValueError: If a profile has unknown or missing keys, or shares its
+            template or download folder with another profile
+    """
+    base = default_profile()
+    profiles = {base['name']: base}
+
+    if not os.path.exists(profiles_file):
+        return profiles
+
+    with open(profiles_file, encoding='utf-8') as f:
+        configured = json.load(f)
+
+    for name, overrides in configured.items():
+        unknown = set(overrides) - set(PROFILE_KEYS)
+        if unknown:
+            raise ValueError(f"Profile '{name}' has unknown keys: {', '.join(sorted(unknown))}")
+        missing = [key for key in REQUIRED_KEYS if key not in overrides]
+        if missing:
+            raise ValueError(f"Profile '{name}' is missing required keys: {', '.join(missing)}")
+        profile = dict(base, **overrides, name=name)
+        for key in PATH_KEYS:
+            if not os.path.isabs(profile[key]):
+                profile[key] = str((DATA_DIR / profile[key]).resolve())
+        profiles[name] = profile
+
+    for key in PATH_KEYS:
+        owners = {}
+        for name, profile in profiles.items():
+            path = os.path.realpath(profile[key])
+            if path in owners:
+                raise ValueError(f"Profiles '{owners[path]}' and '{name}' share {key}: {profile[key]}")
+            owners[path] = name
+
+    return profiles
+
+
+def run_profile(profile, target_date=None, start_date=None, download=False, transform_jobs=None, log_path=None,
+                fresh_downloads=False):
+    """
+    Run the whole flow for one profile (called in a worker process)
+
+    Output goes to log_path so parallel profiles don't interleave.
+
+    Args:
+        log_path: Log file (default: LOGS_DIR/<profile>_<timestamp>.log)
+        fresh_downloads: Download every day even if exports are already in
+            the folder (scheduled runs)
+
+    Returns:
+        Tuple of (profile name, success, log path, seconds, days done) -
+        days done are the report dates ('YYYY-MM-DD') the run finished:
+        when downloading, every day whose downloads all succeeded (with
+        or without rows), otherwise the days with rows in the template;
+        none if the run itself failed
+    """
+    started = time.time()
+    if log_path is None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        log_path = os.path.join(LOGS_DIR, f"{profile['name']}_{stamp}.log")
+    os.makedirs(profile['downloads_folder'], exist_ok=True)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    done = []
+
+    with open(log_path, 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            ctx = RunContext.from_profile(
+                profile, target_date=target_date, start_date=start_date, transform_jobs=transform_jobs,
+                fresh_downloads=fresh_downloads
+            )
+
+            failed_days = set()
+            if download:
+                for day in ctx.report_dates():
+                    if not hmecloud.download_all_stores(report_date=day, ctx=ctx):
+                        failed_days.add(day.strftime('%Y-%m-%d'))
+                if failed_days:
+                    print(f"\n⚠️  Incomplete downloads for: {', '.join(sorted(failed_days))}")
+
+            ran = bool(complete_automation.main(ctx=ctx))
+            if ran and download:
+                # A closed store's day downloads fine and has no rows - it is still done
+                done = [day.strftime('%Y-%m-%d') for day in ctx.report_dates()]
+                done = [day for day in done if day not in failed_days]
+            elif ran:
+                done = list(ctx.results.get('days_covered', []))
+            success = ran and not failed_days
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"\n❌ Profile '{profile['name']}' failed: {e}")
+            success = False
+
+    return profile['name'], success, log_path, time.time() - started, done
+
+
+def run_profiles(names=None, target_date=None, start_date=None, download=False, jobs=PROFILE_JOBS,
+                 profiles_file=PROFILES_FILE):
+    """
+    Run several profiles concurrently, each in its own worker process
+
+    Args:
+        names: Profile names to run (default: all)
+        target_date: Report date (default: yesterday)
+        start_date: First day of a catch-up range
+        download: Download from HMECloud first
+        jobs: Profiles run at once (default: all)
+        profiles_file: JSON file with extra profiles
+
+    Returns:
+        True if every profile succeeded
+    """
+    profiles = load_profiles(profiles_file)
+    names = names or list(profiles)
+    missing = [name for name in names if name not in profiles]
+    if missing:
+        print(f"❌ Unknown profile(s): {', '.join(missing)} (available: {', '.join(profiles)})")
+        return False
+
+    jobs = min(jobs or len(names), len(names))
+    # Share the CPUs between profiles for the per-file transform stage
+    transform_jobs = max(1, (os.cpu_count() or 1) // jobs)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    print("="*80)
+    print("🌎 DRIVE-THRU AUTOMATION - ALL MARKETS")
+    print("="*80)
+    print(f"Profiles: {', '.join(names)} ({jobs} at a time)")
+    print("="*80)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                run_profile, profiles[name], target_date, start_date, download, transform_jobs,
+                os.path.join(LOGS_DIR, f"{name}_{stamp}.log")
+            ): name
+            for name in names
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = (name, False, None, 0.0, [])
+                print(f"   ❌ {name}: worker crashed: {e}")
+                continue
+            _, success, log_path, seconds, _ = results[name]
+            print(f"   {'✅' if success else '❌'} {name} finished in {seconds:.1f}s - log: {log_path}")
+
+    print(f"\n📊 Summary:")
+    for name in names:
+        _, success, log_path, seconds, _ = results[name]
+        print(f"   - {name}: {'OK' if success else 'FAILED'}")
+
+    return all(results[name][1] for name in names)
+
+
+def main(argv=None):
+    """Command line interface"""
+    parser = argparse.ArgumentParser(description="Run the drive-thru flow for every market profile in parallel")
+    parser.add_argument("--profile", action="append", help="Profile to run (repeatable, default: all)")
+    parser.add_argument("--download", action="store_true", help="Download from HMECloud first")
+    parser.add_argument("--date", help="Report date, or last day of a range (YYYY-MM-DD, default: yesterday)")
+    parser.add_argument("--from", dest="start", help="First day of a catch-up range (YYYY-MM-DD)")
+    parser.add_argument("--jobs", type=int, default=PROFILE_JOBS, help="Profiles run at once")
+    parser.add_argument("--list", action="store_true", help="List configured profiles")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, profile in load_profiles().items():
+            print(f"📋 {name}")
+            print(f"   Template: {profile['template_path']}")
+            print(f"   Stores: {len(profile['stores'])}")
+            print(f"   Downloads: {profile['downloads_folder']}")
+        return 0
+
+    success = run_profiles(
+        names=args.profile,
+        target_date=datetime.strptime(args.date, "%Y-%m-%d") if args.date else None,
+        start_date=datetime.strptime(args.start, "%Y-%m-%d") if args.start else None,
+        download=args.download,
+        jobs=args.jobs,
+    )
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
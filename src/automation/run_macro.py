@@ -12,6 +12,12 @@ import tempfile
 from pathlib import Path
 from datetime import datetime
 
+from .xlsx_access import open_stream, release
+
+# ========== CONFIGURATION ==========
+FUSED_CONVERSION = True  # Without Excel: convert and transform in one parse instead of replaying the macro in openpyxl
+# ===================================
+
 ADDIN_MACRO_CANDIDATES = [
     "DT",
     "DTMacro.xlam!DT",
@@ -282,6 +288,8 @@ def run_dt_macro(excel_file_path):
     """
     app = None
     wb = None
+    # Excel rewrites the file in place
+    release(excel_file_path)
     try:
         import xlwings as xw
         
@@ -346,11 +354,11 @@ def run_dt_macro(excel_file_path):
                 app.quit()
         except Exception:
             pass
-        return run_dt_macro_python_logic(excel_file_path)
+        return run_dt_macro_without_excel(excel_file_path)
         
     except ImportError:
         print("   ⚠️  xlwings not installed. Replicating macro logic in Python...")
-        return run_dt_macro_python_logic(excel_file_path)
+        return run_dt_macro_without_excel(excel_file_path)
     except Exception as e:
         print(f"   ❌ Error running macro: {e}")
         import traceback
@@ -368,6 +376,45 @@ def run_dt_macro(excel_file_path):
         return False
 
 
+def run_dt_macro_without_excel(excel_file_path):
+    """DT conversion without Excel - fused with the transform, or the openpyxl replay"""
+    if FUSED_CONVERSION:
+        return run_dt_macro_fused(excel_file_path)
+    return run_dt_macro_python_logic(excel_file_path)
+
+
+def run_dt_macro_fused(excel_file_path):
+    """
+    Convert with one parse that also produces the transformed data
+    
+    The export is read once; the DT-converted sheet is written from the
+    transformed frame and the frame is cached, so the template update
+    that follows doesn't parse the file again.
+    
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        from .transform_cache import cached_convert_and_transform
+        
+        print(f"\n📝 Converting: {os.path.basename(excel_file_path)} (single pass)")
+        df = cached_convert_and_transform(excel_file_path)
+        
+        print("\n" + "="*80)
+        print("✅ FILE CONVERTED SUCCESSFULLY!")
+        print("="*80)
+        print(f"   📁 File: {os.path.basename(excel_file_path)} ({len(df)} rows)")
+        print(f"   📍 Location: {excel_file_path}")
+        print("="*80)
+        return True
+        
+    except Exception as e:
+        print(f"   ❌ Error converting file: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 def run_dt_macro_python_logic(excel_file_path, wb=None, ws=None):
     """
     Replicate the DT macro logic using openpyxl
@@ -379,7 +426,7 @@ def run_dt_macro_python_logic(excel_file_path, wb=None, ws=None):
         
         if wb is None:
             print(f"\n📝 Opening Excel file: {os.path.basename(excel_file_path)}")
-            wb = load_workbook(excel_file_path)
+            wb = load_workbook(open_stream(excel_file_path))
             ws = wb.active
             should_close = True
         
@@ -452,6 +499,7 @@ def run_dt_macro_python_logic(excel_file_path, wb=None, ws=None):
             ws.delete_cols(10, 2)
         
         # Save changes
+        release(excel_file_path)
         wb.save(excel_file_path)
         if should_close and wb:
             wb.close()
@@ -480,16 +528,24 @@ def run_dt_macro_python_logic(excel_file_path, wb=None, ws=None):
         return False
 
 
-def process_downloaded_file(downloads_folder=None):
+def process_downloaded_file(downloads_folder=None, ctx=None, files=None):
     """
-    Find latest downloaded file and run DT macro on it
+    Run DT macro on downloaded files
+    
+    Converts, in order of preference: the given files, the files the run
+    context downloaded and hasn't converted yet, or the latest file in the
+    downloads folder.
     
     Args:
-        downloads_folder: Path to downloads folder (defaults to data/downloads)
+        downloads_folder: Path to downloads folder (defaults to the context's, then data/downloads)
+        ctx: RunContext of the current run - converted files are recorded on it
+        files: Exact files to convert
     
     Returns:
         True if successful, False otherwise
     """
+    if downloads_folder is None and ctx is not None:
+        downloads_folder = ctx.downloads_folder
     if downloads_folder is None:
         BASE_DIR = Path(__file__).resolve().parents[2]
         downloads_folder = BASE_DIR / "data" / "downloads"
@@ -500,25 +556,36 @@ def process_downloaded_file(downloads_folder=None):
     print("🔄 RUNNING DT MACRO ON DOWNLOADED FILE")
     print("="*80)
     
-    # Find latest file
-    latest_file = find_latest_downloaded_file(downloads_folder)
+    if files is None and ctx is not None and ctx.downloaded_files:
+        files = [path for path in ctx.downloaded_files if path not in ctx.converted_files]
+    if files is None:
+        # Find latest file
+        latest_file = find_latest_downloaded_file(downloads_folder)
+        files = [latest_file] if latest_file else []
     
-    if not latest_file:
+    if not files:
         print("   ❌ No Excel files found in downloads folder")
         return False
     
-    print(f"   📄 Found file: {os.path.basename(latest_file)}")
-    print(f"   📅 Modified: {datetime.fromtimestamp(os.path.getmtime(latest_file)).strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Run macro
-    success = run_dt_macro(latest_file)
+    success = True
+    for path in files:
+        print(f"   📄 Found file: {os.path.basename(path)}")
+        print(f"   📅 Modified: {datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # Run macro
+        if run_dt_macro(path):
+            if ctx is not None:
+                ctx.add_converted(path)
+        else:
+            success = False
     
     if success:
         print("\n" + "="*80)
         print("✅ FILE CONVERTED SUCCESSFULLY!")
         print("="*80)
-        print(f"   📁 File: {os.path.basename(latest_file)}")
-        print(f"   📍 Location: {latest_file}")
+        for path in files:
+            print(f"   📁 File: {os.path.basename(path)}")
+            print(f"   📍 Location: {path}")
         print("="*80)
         return True
     else:
@@ -0,0 +1,248 @@
+"""
+Scheduler Module
+Runs the daily drive-thru job for every market at configured times
+
+For each profile (see automation.profiles) the scheduler remembers the
+last business date that ran successfully. When a run time comes round
+it queues every business date since then - after a weekend or an outage
+that is one catch-up run over the whole range (downloaded day by day,
+pasted and saved once), not one run per missed day. Scheduled runs
+always download afresh, and the remembered date only moves past days
+whose downloads all succeeded in a run that succeeded - with or without
+rows, so a day the stores were closed doesn't hold it back. A day whose
+download failed is queued again at the next run time.
+
+Markets start PROFILE_STAGGER seconds apart and run one at a time, each
+with all CPUs for its transform, so they never compete for the same cores.
+
+USAGE:
+    python3 -m automation.scheduler              # Run forever
+    python3 -m automation.scheduler --once       # Run whatever is due now and exit (cron)
+    python3 -m automation.scheduler --status     # Show last successful date per market
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from . import profiles
+
+# ========== CONFIGURATION ==========
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_DIR = BASE_DIR / "data"
+STATE_FILE = str((DATA_DIR / "cache" / "scheduler.json").resolve())
+SCHEDULE_TIMES = ["06:30"]          # Local times the daily job runs
+BUSINESS_WEEKDAYS = [0, 1, 2, 3, 4, 5, 6]  # Report days (Monday = 0) - stores trade every day
+PROFILE_STAGGER = 300               # Seconds between market start times
+MAX_CATCH_UP_DAYS = 31              # Oldest missed day a catch-up run goes back to
+CHECK_INTERVAL = 30                 # Seconds between schedule checks
+DOWNLOAD = True                     # Download from HMECloud before updating the template
+# ===================================
+
+
+def load_state(state_file=STATE_FILE):
+    """Scheduler state: {profile name: {'last_success', 'last_attempt', 'last_result'}}"""
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, state_file=STATE_FILE):
+    """Write the state atomically"""
+    os.makedirs(os.path.dirname(state_file), exist_ok=True)
+    with open(state_file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(state_file + '.tmp', state_file)
+
+
+def pending_dates(last_success, today):
+    """
+    Business dates not yet run, oldest first
+
+    Args:
+        last_success: Last business date that ran (date or None)
+        today: Current date - the newest report is for the day before
+
+    Returns:
+        List of dates
+    """
+    newest = today - timedelta(days=1)
+    if last_success is None:
+        first = newest
+    else:
+        first = max(last_success + timedelta(days=1), newest - timedelta(days=MAX_CATCH_UP_DAYS - 1))
+    days = [first + timedelta(days=i) for i in range((newest - first).days + 1)]
+    return [day for day in days if day.weekday() in BUSINESS_WEEKDAYS]
+
+
+def slots(day, index):
+    """Start times of a profile's runs on a day (staggered by its position)"""
+    offset = timedelta(seconds=index * PROFILE_STAGGER)
+    times = []
+    for value in SCHEDULE_TIMES:
+        hour, minute = (int(part) for part in value.split(':'))
+        times.append(datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute) + offset)
+    return sorted(times)
+
+
+def due_runs(all_profiles, state, now=None):
+    """
+    Profiles whose run time has passed and that have business dates to catch up
+
+    A profile is retried at the next slot after a failure, not straight away.
+
+    Returns:
+        List of (profile name, start date or None, target date, business dates),
+        in stagger order
+    """
+    now = now or datetime.now()
+    runs = []
+    for index, name in enumerate(all_profiles):
+        passed = [slot for slot in slots(now.date(), index) if slot <= now]
+        if not passed:
+            continue
+        entry = state.get(name, {})
+        last_attempt = entry.get('last_attempt')
+        if last_attempt and datetime.fromisoformat(last_attempt) >= passed[-1]:
+            continue
+        last_success = entry.get('last_success')
+        dates = pending_dates(
+            datetime.strptime(last_success, '%Y-%m-%d').date() if last_success else None,
+            now.date()
+        )
+        if not dates:
+            continue
+        start = dates[0] if len(dates) > 1 else None
+        runs.append((name, start, dates[-1], dates))
+    return runs
+
+
+def _as_datetime(day):
+    return datetime.combine(day, datetime.min.time()) if day is not None else None
+
+
+def last_done(dates, finished):
+    """
+    Newest date up to which every queued date is finished
+
+    A day the run didn't finish (a failed download, or the whole run
+    failed) stops the advance, so it is queued again at the next slot
+    together with the days after it.
+
+    Args:
+        dates: Business dates of the run, oldest first
+        finished: Report dates ('YYYY-MM-DD') the run finished (see
+            profiles.run_profile)
+
+    Returns:
+        Date, or None if the first date isn't finished
+    """
+    done = None
+    for day in dates:
+        if day.strftime('%Y-%m-%d') not in finished:
+            break
+        done = day
+    return done
+
+
+def run_due(profiles_file=profiles.PROFILES_FILE, state_file=STATE_FILE, download=DOWNLOAD, now=None):
+    """
+    Run every due profile, one after another
+
+    Returns:
+        Number of runs that failed
+    """
+    all_profiles = profiles.load_profiles(profiles_file)
+    state = load_state(state_file)
+    failed = 0
+
+    for name, start, target, dates in due_runs(all_profiles, state, now):
+        label = f"{start} - {target}" if start else f"{target}"
+        print(f"🕐 {datetime.now():%Y-%m-%d %H:%M} - {name}: {label}{' (catch-up)' if start else ''}")
+
+        entry = state.setdefault(name, {})
+        entry['last_attempt'] = datetime.now().isoformat(timespec='seconds')
+        save_state(state, state_file)
+
+        log_path = os.path.join(profiles.LOGS_DIR, f"{name}_{datetime.now():%Y%m%d_%H%M%S}.log")
+        # A fresh process per run; markets run one at a time, so each gets every CPU
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                # Always download afresh - exports left from earlier runs would pass for these days
+                _, success, log_path, seconds, finished = executor.submit(
+                    profiles.run_profile, all_profiles[name], _as_datetime(target), _as_datetime(start),
+                    download, os.cpu_count() or 1, log_path, fresh_downloads=download
+                ).result()
+            except Exception as e:
+                success, seconds, finished = False, 0.0, []
+                print(f"   ❌ {name}: worker crashed: {e}")
+
+        done = last_done(dates, set(finished))
+        if done is not None:
+            entry['last_success'] = done.strftime('%Y-%m-%d')
+        if success and done == dates[-1]:
+            entry['last_result'] = 'ok'
+        else:
+            entry['last_result'] = 'partial' if done is not None else 'failed'
+            failed += 1
+            missing = [day.strftime('%Y-%m-%d') for day in dates if day.strftime('%Y-%m-%d') not in finished]
+            if missing:
+                print(f"   ⚠️  {name}: not finished for {', '.join(missing)} - retried at the next slot")
+        save_state(state, state_file)
+        print(f"   {'✅' if entry['last_result'] == 'ok' else '❌'} {name} finished in {seconds:.1f}s - log: {log_path}")
+
+    return failed
+
+
+def show_status(profiles_file=profiles.PROFILES_FILE, state_file=STATE_FILE):
+    """Print the last successful business date of every profile"""
+    state = load_state(state_file)
+    today = datetime.now().date()
+    for name in profiles.load_profiles(profiles_file):
+        entry = state.get(name, {})
+        last_success = entry.get('last_success')
+        missing = pending_dates(datetime.strptime(last_success, '%Y-%m-%d').date() if last_success else None, today)
+        print(f"📋 {name}")
+        print(f"   Last successful date: {last_success or 'never'}")
+        print(f"   Last attempt: {entry.get('last_attempt', 'never')} ({entry.get('last_result', '-')})")
+        print(f"   Days pending: {len(missing)}")
+
+
+def main(argv=None):
+    """Command line interface"""
+    parser = argparse.ArgumentParser(description="Run the daily drive-thru job on a schedule")
+    parser.add_argument("--once", action="store_true", help="Run whatever is due now and exit")
+    parser.add_argument("--status", action="store_true", help="Show last successful date per market")
+    parser.add_argument("--no-download", action="store_true", help="Use files already in the download folders")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        show_status()
+        return 0
+
+    download = DOWNLOAD and not args.no_download
+    if args.once:
+        return 1 if run_due(download=download) else 0
+
+    print("="*80)
+    print("⏰ DRIVE-THRU SCHEDULER")
+    print("="*80)
+    print(f"Run times: {', '.join(SCHEDULE_TIMES)} (markets {PROFILE_STAGGER}s apart)")
+    print("="*80)
+    try:
+        while True:
+            run_due(download=download)
+            time.sleep(CHECK_INTERVAL)
+    except KeyboardInterrupt:
+        print("\n🛑 Scheduler stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
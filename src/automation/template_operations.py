@@ -3,23 +3,40 @@ Template Operations Module
 Handles pasting data, formulas, pivot tables, dates
 """
 
+import os
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 from datetime import datetime
-import shutil
+
+from .xlsx_access import copy_file, open_stream, release
 
 
 def create_backup(template_path):
     """Create backup of template"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = template_path.replace('.xlsx', f'_backup_{timestamp}.xlsx')
-    shutil.copy2(template_path, backup_path)
+    # Claim the name - concurrent runs prefetch their backups in the same second
+    for n in range(1, 1000):
+        suffix = f'_backup_{timestamp}.xlsx' if n == 1 else f'_backup_{timestamp}_{n}.xlsx'
+        backup_path = template_path.replace('.xlsx', suffix)
+        try:
+            os.close(os.open(backup_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            break
+        except FileExistsError:
+            continue
+    else:
+        raise FileExistsError(f"Every backup name for {timestamp} is taken: {template_path}")
+    copy_file(template_path, backup_path)
     print(f"\n✅ Backup created: {backup_path}")
     return backup_path
 
 
-def paste_to_template(data_frames, template_path, target_sheet='AllStores'):
+def load_template(template_path):
+    """Load the template workbook (safe to run on a background thread)"""
+    return load_workbook(open_stream(template_path))
+
+
+def paste_to_template(data_frames, template_path, target_sheet='AllStores', wb=None):
     """
     Paste transformed data into template
     
@@ -27,6 +44,7 @@ def paste_to_template(data_frames, template_path, target_sheet='AllStores'):
         data_frames: List of DataFrames (one per store)
         template_path: Path to Drive Thru template
         target_sheet: Sheet name to paste into
+        wb: Template already loaded with load_template (loaded here if None)
     
     Returns:
         Workbook object
@@ -34,7 +52,8 @@ def paste_to_template(data_frames, template_path, target_sheet='AllStores'):
     print(f"\n📋 Pasting data into template...")
     
     # Load template
-    wb = load_workbook(template_path)
+    if wb is None:
+        wb = load_template(template_path)
     
     # Find target sheet
     if target_sheet not in wb.sheetnames:
@@ -151,11 +170,31 @@ def update_dates(wb, target_date, sheet_configs):
     return wb
 
 
-def save_template(wb, output_path):
-    """Save the workbook"""
+def save_template(wb, output_path, before_replace=None):
+    """
+    Save the workbook
+
+    The workbook is written to a temporary file next to output_path and
+    then swapped in, so a crash mid-save never leaves a half-written template.
+
+    Args:
+        wb: Workbook object
+        output_path: Path to save to
+        before_replace: Optional callable(temp_path) run once the new file
+            is complete on disk, just before it replaces output_path
+    """
     print(f"\n💾 Saving template...")
-    wb.save(output_path)
+    temp_path = output_path + '.saving'
+    wb.save(temp_path)
     wb.close()
+    with open(temp_path, 'rb') as f:
+        os.fsync(f.fileno())
+
+    if before_replace is not None:
+        before_replace(temp_path)
+
+    release(output_path)
+    os.replace(temp_path, output_path)
     print(f"   ✅ Saved: {output_path}")
 
 
@@ -0,0 +1,259 @@
+"""
+Template Writer Module
+Group commit of template updates from concurrent callers
+
+Every caller (the Streamlit app, scripts/full_automation.py, a cron job)
+spools its transformed frames next to the template and then tries to
+take the template lock. Whoever gets it becomes the writer: it waits a
+short window for more submissions, applies every pending one in a single
+load/save cycle and posts a result for each. The others only wait for
+their result - or take over if the writer goes away first.
+
+    <template>.lock                 exclusive lock (fcntl.flock)
+    <template>.spool/<id>.job       pending submission (pickled)
+    <template>.spool/<id>.result    outcome of a submission (JSON)
+"""
+
+import os
+import glob
+import json
+import time
+import uuid
+import pickle
+import contextlib
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ========== CONFIGURATION ==========
+GROUP_COMMIT_WINDOW = 2.0   # Seconds the writer waits for more submissions
+LOCK_TIMEOUT = 1800         # Seconds to wait for the lock or for a result
+POLL_INTERVAL = 0.2         # Seconds between lock / result checks
+# ===================================
+
+LOCK_SUFFIX = '.lock'
+SPOOL_SUFFIX = '.spool'
+
+
+def lock_path(template_path):
+    """Lock file for a template"""
+    return str(template_path) + LOCK_SUFFIX
+
+
+def spool_dir(template_path):
+    """Spool directory for a template's pending submissions"""
+    return str(template_path) + SPOOL_SUFFIX
+
+
+@contextlib.contextmanager
+def template_lock(template_path, blocking=True, timeout=LOCK_TIMEOUT):
+    """
+    Exclusive lock on a template, across processes and threads
+
+    Args:
+        template_path: Path to Drive Thru template
+        blocking: Wait for the lock (otherwise yield False if it is taken)
+        timeout: Seconds to wait before raising TimeoutError
+
+    Yields:
+        True if the lock is held
+    """
+    if fcntl is None:
+        print("   ⚠️  File locking is not available here - template writes are not serialized")
+        yield True
+        return
+
+    fd = os.open(lock_path(template_path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.time() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+                break
+            except BlockingIOError:
+                if not blocking:
+                    acquired = False
+                    break
+                if time.time() > deadline:
+                    raise TimeoutError(f"Template is still locked after {timeout}s: {template_path}")
+                time.sleep(POLL_INTERVAL)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def _write_atomic(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def spool_job(template_path, job):
+    """
+    Queue a submission for the next batch
+
+    Args:
+        template_path: Path to Drive Thru template
+        job: Picklable dict describing the update
+
+    Returns:
+        Job id
+    """
+    folder = spool_dir(template_path)
+    os.makedirs(folder, exist_ok=True)
+    job_id = datetime.now().strftime('%Y%m%d_%H%M%S_') + uuid.uuid4().hex[:6]
+    _write_atomic(os.path.join(folder, job_id + '.job'), pickle.dumps(dict(job, submitted=time.time())))
+    return job_id
+
+
+def pending_jobs(template_path):
+    """
+    Submissions waiting for a writer, oldest first
+
+    Returns:
+        Dict of {job id: job}
+    """
+    jobs = {}
+    for path in sorted(glob.glob(os.path.join(spool_dir(template_path), '*.job'))):
+        job_id = os.path.basename(path)[:-len('.job')]
+        try:
+            with open(path, 'rb') as f:
+                jobs[job_id] = pickle.load(f)
+        except Exception as e:
+            print(f"   ⚠️  Unreadable submission {job_id}: {e}")
+    return jobs
+
+
+def _post_result(template_path, job_id, result):
+    folder = spool_dir(template_path)
+    _write_atomic(os.path.join(folder, job_id + '.result'), json.dumps(result, default=str).encode('utf-8'))
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(os.path.join(folder, job_id + '.job'))
+
+
+def take_result(template_path, job_id):
+    """Collect the result of a submission (None while it is pending)"""
+    path = os.path.join(spool_dir(template_path), job_id + '.result')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        result = json.load(f)
+    os.remove(path)
+    return result
+
+
+def _sweep_results(template_path, max_age=LOCK_TIMEOUT):
+    """Drop results nobody collected (their caller went away)"""
+    for path in glob.glob(os.path.join(spool_dir(template_path), '*.result')):
+        with contextlib.suppress(FileNotFoundError):
+            if time.time() - os.path.getmtime(path) > max_age:
+                os.remove(path)
+
+
+def serve(template_path, apply_batch, window=GROUP_COMMIT_WINDOW, local_jobs=None):
+    """
+    Apply one batch of pending submissions (call with the template lock held)
+
+    Args:
+        template_path: Path to Drive Thru template
+        apply_batch: Function taking a collect() callable and returning
+            {job id: result dict}; collect() waits out the rest of the
+            window and returns the pending jobs, so the writer can load
+            the template in the meantime
+        window: Seconds to wait for more submissions
+        local_jobs: Jobs of the calling process that were never spooled -
+            batched with the spooled ones, their results are returned
+            instead of posted
+
+    Returns:
+        Dict of {job id: result dict} for local_jobs
+    """
+    started = time.time()
+    collected = {}
+    local_jobs = local_jobs or {}
+
+    def collect():
+        remaining = window - (time.time() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+        collected.update(pending_jobs(template_path))
+        collected.update(local_jobs)
+        print(f"   📦 Group commit: {len(collected)} submission(s) in this batch")
+        return dict(collected)
+
+    try:
+        results = apply_batch(collect)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        print(f"   ❌ Template update failed: {e}")
+        if not collected:
+            collected.update(pending_jobs(template_path))
+            collected.update(local_jobs)
+        results = {job_id: {'success': False, 'error': str(e)} for job_id in collected}
+
+    for job_id in collected:
+        if job_id not in local_jobs:
+            _post_result(template_path, job_id, results.get(job_id, {'success': False, 'error': 'not applied'}))
+    _sweep_results(template_path)
+    return {job_id: results.get(job_id, {'success': False, 'error': 'not applied'}) for job_id in local_jobs}
+
+
+def submit(template_path, job, apply_batch, window=GROUP_COMMIT_WINDOW, timeout=LOCK_TIMEOUT, spool=True):
+    """
+    Submit an update and return once a batch containing it was applied
+
+    The caller becomes the writer if the template lock is free; otherwise
+    it waits for the current writer to pick its submission up.
+
+    Args:
+        template_path: Path to Drive Thru template
+        job: Picklable dict describing the update
+        apply_batch: See serve()
+        window: Seconds a writer waits for more submissions
+        timeout: Seconds to wait for a result
+        spool: Write the job to the spool so another writer can apply it;
+            False keeps it in memory and waits to become the writer
+
+    Returns:
+        Result dict of this submission (at least {'success': bool})
+    """
+    if not spool:
+        job_id = 'local_' + uuid.uuid4().hex[:6]
+        with template_lock(template_path, timeout=timeout):
+            return serve(template_path, apply_batch, window, local_jobs={job_id: job})[job_id]
+
+    job_id = spool_job(template_path, job)
+    deadline = time.time() + timeout
+    waiting = False
+
+    while True:
+        result = take_result(template_path, job_id)
+        if result is not None:
+            return result
+
+        with template_lock(template_path, blocking=False) as acquired:
+            if acquired:
+                # A writer may have finished our job just before releasing
+                result = take_result(template_path, job_id)
+                if result is not None:
+                    return result
+                serve(template_path, apply_batch, window)
+                continue
+
+        if not waiting:
+            print("   ⏳ Another run is updating the template - waiting to be included in its batch...")
+            waiting = True
+        if time.time() > deadline:
+            raise TimeoutError(f"No template writer picked up submission {job_id} within {timeout}s")
+        time.sleep(POLL_INTERVAL)
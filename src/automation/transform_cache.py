@@ -0,0 +1,250 @@
+"""
+Transform Cache Module
+Keeps transformed DataFrames on disk so unchanged downloads are not re-parsed
+
+USAGE:
+    python3 -m automation.transform_cache info     # Show cache contents
+    python3 -m automation.transform_cache clear    # Delete all entries
+"""
+
+import os
+import sys
+import glob
+import pickle
+import hashlib
+import argparse
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+
+from .transform_data import (
+    transform_raw_car_data,
+    convert_and_transform,
+    detect_layout,
+    write_converted_sheet,
+    COLUMN_MAPPING,
+    TRANSFORM_VERSION,
+)
+from .xlsx_access import read_bytes_view
+
+# ========== CONFIGURATION ==========
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_DIR = BASE_DIR / "data"
+CACHE_DIR = str((DATA_DIR / "cache" / "transforms").resolve())
+CACHE_MAX_BYTES = 512 * 1024 * 1024   # Least recently used entries are evicted above this
+# ===================================
+
+CACHE_EXTENSIONS = ('.feather', '.pkl')
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents (hashed straight from the shared mapping)"""
+    return hashlib.sha256(read_bytes_view(path)).hexdigest()
+
+
+def cache_key(input_file):
+    """
+    Cache key for a raw file
+
+    Combines the file contents with the transform version and column
+    mapping, so changing either invalidates every entry.
+    """
+    key = hashlib.sha256()
+    key.update(file_digest(input_file).encode())
+    key.update(f"v{TRANSFORM_VERSION}".encode())
+    key.update(repr(sorted(COLUMN_MAPPING.items())).encode())
+    return key.hexdigest()
+
+
+def _entries(cache_dir):
+    """All cache entry files in the cache directory"""
+    return [
+        path
+        for ext in CACHE_EXTENSIONS
+        for path in glob.glob(os.path.join(cache_dir, f"*{ext}"))
+    ]
+
+
+def load_cached(key, cache_dir=CACHE_DIR):
+    """
+    Load a cached frame
+
+    Returns:
+        DataFrame, or None on a cache miss
+    """
+    for ext in CACHE_EXTENSIONS:
+        path = os.path.join(cache_dir, key + ext)
+        if not os.path.exists(path):
+            continue
+        try:
+            if ext == '.feather':
+                df = pd.read_feather(path)
+            else:
+                with open(path, 'rb') as f:
+                    df = pickle.load(f)
+        except Exception as e:
+            print(f"   ⚠️  Ignoring unreadable cache entry {os.path.basename(path)}: {e}")
+            continue
+
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+        return df
+
+    return None
+
+
+def store_cached(key, df, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Store a frame in the cache (Feather when pyarrow is installed, else pickle)
+
+    Returns:
+        Path of the cache entry
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    path = None
+    if importlib.util.find_spec('pyarrow') is not None:
+        path = os.path.join(cache_dir, key + '.feather')
+        try:
+            df.reset_index(drop=True).to_feather(path + '.tmp')
+        except Exception:
+            # Mixed-type object columns can't be stored as Arrow
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+            path = None
+
+    if path is None:
+        path = os.path.join(cache_dir, key + '.pkl')
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(path + '.tmp', path)
+    evict(cache_dir, max_bytes)
+    return path
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Delete least recently used entries until the cache fits in max_bytes
+
+    Returns:
+        Number of entries removed
+    """
+    entries = []
+    for path in _entries(cache_dir):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+
+    return removed
+
+
+def cached_transform(input_file, engine=None, cache_dir=CACHE_DIR):
+    """
+    transform_raw_car_data with an on-disk cache in front of it
+
+    Args:
+        input_file: Path to raw Excel file from HMECloud
+        engine: Reader engine used on a cache miss
+        cache_dir: Cache directory
+
+    Returns:
+        DataFrame with transformed data
+    """
+    key = cache_key(input_file)
+
+    df = load_cached(key, cache_dir)
+    if df is not None:
+        print(f"\n   ♻️  Cache hit: {os.path.basename(input_file)} ({len(df)} rows)")
+        df.attrs['reader_engine'] = 'cache'
+        return df
+
+    df = transform_raw_car_data(input_file, engine)
+    store_cached(key, df, cache_dir)
+    return df
+
+
+def cached_convert_and_transform(input_file, engine=None, cache_dir=CACHE_DIR):
+    """
+    Fused DT conversion + transform with the cache on both sides
+
+    The raw export is parsed once (not at all on a cache hit) and the
+    DT-converted sheet is written over it from the frame. The frame is
+    also cached under the converted file's key, so the transform that
+    follows is a cache hit instead of a second parse.
+
+    Args:
+        input_file: Path to raw Excel file from HMECloud
+        engine: Reader engine used on a cache miss
+        cache_dir: Cache directory
+
+    Returns:
+        DataFrame with transformed data
+    """
+    key = cache_key(input_file)
+    df = load_cached(key, cache_dir)
+    if df is None:
+        df = convert_and_transform(input_file, engine=engine)
+        store_cached(key, df, cache_dir)
+    elif detect_layout(input_file)['name'] == 'raw':
+        print(f"\n   ♻️  Cache hit: {os.path.basename(input_file)} ({len(df)} rows)")
+        write_converted_sheet(df, input_file)
+
+    converted_key = cache_key(input_file)
+    if converted_key != key:
+        store_cached(converted_key, df, cache_dir)
+    return df
+
+
+def cache_info(cache_dir=CACHE_DIR):
+    """Return (entry_count, total_bytes) for the cache"""
+    sizes = [os.path.getsize(path) for path in _entries(cache_dir)]
+    return len(sizes), sum(sizes)
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """Delete every cache entry; returns the number removed"""
+    entries = _entries(cache_dir)
+    for path in entries:
+        os.remove(path)
+    return len(entries)
+
+
+def main(argv=None):
+    """Command line interface"""
+    parser = argparse.ArgumentParser(description="Inspect or clear the transform cache")
+    parser.add_argument("command", choices=["info", "clear"])
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        count, total = cache_info(args.cache_dir)
+        print(f"📦 Transform cache: {args.cache_dir}")
+        print(f"   Entries: {count}")
+        print(f"   Size: {total / (1024 * 1024):.1f} MB (limit {CACHE_MAX_BYTES / (1024 * 1024):.0f} MB)")
+        for path in sorted(_entries(args.cache_dir), key=os.path.getmtime, reverse=True):
+            print(f"   - {os.path.basename(path)}  {os.path.getsize(path) / 1024:.0f} KB")
+    else:
+        removed = clear_cache(args.cache_dir)
+        print(f"🗑️  Removed {removed} cache entries from {args.cache_dir}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,75 +3,1050 @@ Data Transformation Module
 Replicates Ctrl+D macro - works for UNLIMITED rows!
 """
 
+import io
+import os
+import re
+import time
+import posixpath
+import importlib.util
+import numpy as np
 import pandas as pd
-from datetime import datetime
+import xml.etree.ElementTree as ET
+from datetime import datetime, time as dt_time
+from concurrent.futures import ProcessPoolExecutor
 
+from .xlsx_access import open_members, open_stream, release
 
-def transform_raw_car_data(input_file):
+# ========== RAW REPORT LAYOUT ==========
+# Column mapping (0-indexed)
+COLUMN_MAPPING = {
+    0: 'Daypart',           # Column A
+    2: 'Departure Time',    # Column C
+    4: 'Event Name',        # Column E
+    7: 'Cars in Queue',     # Column H
+    11: 'Menu Board',       # Column L
+    15: 'Greet',            # Column P
+    18: 'Service',          # Column S
+    19: 'Lane Queue',       # Column T
+    22: 'Lane Total',       # Column W
+    23: 'Lane Total 2'      # Column X
+}
+
+STORE_NAME_CELL = (3, 1)    # B4
+DATA_START_ROW = 7          # Row 8 - first row below the header
+
+# Template column order (also the DT-converted sheet layout)
+OUTPUT_COLUMNS = ['Daypart', 'Store Name'] + list(COLUMN_MAPPING.values())[1:]
+
+RAW_LAYOUT = {
+    'name': 'raw',
+    'columns': COLUMN_MAPPING,
+    'store_cell': STORE_NAME_CELL,
+    'data_start_row': DATA_START_ROW,
+}
+
+# Raw sheets are scanned from the top with column B included, so workbooks
+# holding several store/day blocks can be split in one pass
+SEGMENT_STORE_COLUMN = '_store_cell'
+SEGMENT_COLUMN = '_segment'
+RAW_SCAN_LAYOUT = {
+    'name': 'raw',
+    'columns': {STORE_NAME_CELL[1]: SEGMENT_STORE_COLUMN, **COLUMN_MAPPING},
+    'store_cell': STORE_NAME_CELL,
+    'data_start_row': 0,
+}
+
+SNIFF_ROWS = 10             # Rows read by detect_layout
+
+# Bump when the transform output changes (invalidates cached frames)
+TRANSFORM_VERSION = 2
+
+STREAM_BATCH_SIZE = 5000    # Rows per batch in streaming mode
+
+# Reader engine selection - set HME_READER_ENGINE to force one
+# (e.g. HME_READER_ENGINE=pandas) without code changes
+READER_ENGINE_ENV = 'HME_READER_ENGINE'
+LARGE_FILE_BYTES = 32 * 1024 * 1024
+ENGINE_PREFERENCE = ['calamine', 'xml', 'streaming', 'pandas']
+LARGE_FILE_ENGINE_PREFERENCE = ['xml', 'streaming', 'calamine', 'pandas']
+
+# Parallel sheet parsing (xml engine) - one huge worksheet is split at
+# <row> boundaries and parsed across processes; set workers to 1 to disable
+PARALLEL_PARSE_BYTES = 64 * 1024 * 1024     # Uncompressed sheet XML size
+PARALLEL_PARSE_WORKERS = os.cpu_count() or 1
+PARALLEL_PARSE_CHUNKS_PER_WORKER = 2
+
+# Typed output schema (typed=True)
+CATEGORY_COLUMNS = ['Store Name', 'Daypart', 'Event Name']
+COUNT_COLUMNS = ['Cars in Queue']
+TIMING_COLUMNS = ['Menu Board', 'Greet', 'Service', 'Lane Queue', 'Lane Total', 'Lane Total 2']
+DEPARTURE_TIME_FORMATS = [
+    '%m/%d/%Y %I:%M:%S %p',
+    '%m/%d/%Y %I:%M %p',
+    '%m/%d/%Y %H:%M:%S',
+    '%Y-%m-%d %I:%M:%S %p',
+    '%Y-%m-%d %H:%M:%S',
+    '%d/%m/%Y %H:%M:%S',
+    '%b %d, %Y %I:%M:%S %p',
+    '%b %d, %Y %I:%M %p',
+]
+# =======================================
+
+EXCEL_ERROR_CODES = ('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A')
+
+# SpreadsheetML namespaces used by the raw XML reader
+SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+DEFAULT_SHEET_MEMBER = 'xl/worksheets/sheet1.xml'
+
+
+def _finalize_frame(df, store_name):
     """
-    Transform raw HME car data to template format
-    
+    Apply the Ctrl+D clean-up to extracted columns
+
     Args:
-        input_file: Path to raw Excel file from HMECloud
-    
+        df: DataFrame with the layout's columns, one row per sheet row
+        store_name: Store name to stamp on every row (ignored when the
+            sheet already has a Store Name column)
+
     Returns:
-        DataFrame with transformed data
+        DataFrame in template column order
     """
-    print(f"\n   Transforming: {input_file}")
-    
-    # Read raw file
-    raw_df = pd.read_excel(input_file, sheet_name=0, header=None)
-    
-    # Extract store name from row 3, column 1
-    store_name = raw_df.iloc[3, 1]
-    print(f"   Store: {store_name}")
-    
-    # Column mapping (0-indexed)
-    column_mapping = {
-        0: 'Daypart',           # Column A
-        2: 'Departure Time',    # Column C
-        4: 'Event Name',        # Column E
-        7: 'Cars in Queue',     # Column H
-        11: 'Menu Board',       # Column L
-        15: 'Greet',            # Column P
-        18: 'Service',          # Column S
-        19: 'Lane Queue',       # Column T
-        22: 'Lane Total',       # Column W
-        23: 'Lane Total 2'      # Column X
-    }
-    
-    # Extract data starting from row 7
-    transformed_data = []
-    for idx in range(7, len(raw_df)):
-        row_data = {}
-        for col_idx, col_name in column_mapping.items():
-            row_data[col_name] = raw_df.iloc[idx, col_idx]
-        transformed_data.append(row_data)
-    
-    # Create DataFrame
-    df = pd.DataFrame(transformed_data)
-    
-    # Add Store Name column
-    df.insert(1, 'Store Name', store_name)
-    
-    # Fill down Daypart column
-    df['Daypart'] = df['Daypart'].ffill()
-    
+    if 'Store Name' in df:
+        # DT-converted sheets only have the store filled down part of the way
+        df['Store Name'] = df['Store Name'].ffill()
+    else:
+        # Add Store Name column
+        df.insert(1, 'Store Name', store_name)
+
+    # Fill down Daypart column (within each store block)
+    if SEGMENT_COLUMN in df:
+        df['Daypart'] = df.groupby(SEGMENT_COLUMN)['Daypart'].ffill()
+    else:
+        df['Daypart'] = df['Daypart'].ffill()
+    df = df[OUTPUT_COLUMNS]
+
     # Remove rows where Event Name is NaN
     df = df[df['Event Name'].notna()].copy()
-    df = df.reset_index(drop=True)
-    
+    return df.reset_index(drop=True)
+
+
+# Departure Time format per value shape (digits masked), detected once
+_departure_format_cache = {}
+
+
+def _departure_time_format(sample):
+    """Find (and cache) the strptime format matching a Departure Time string"""
+    key = re.sub(r'\d', '0', sample)
+    if key not in _departure_format_cache:
+        _departure_format_cache[key] = None
+        for fmt in DEPARTURE_TIME_FORMATS:
+            try:
+                datetime.strptime(sample, fmt)
+            except ValueError:
+                continue
+            _departure_format_cache[key] = fmt
+            break
+    return _departure_format_cache[key]
+
+
+def parse_departure_times(series):
+    """Parse Departure Time to datetime64 using one cached format"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    text = series.dropna()
+    text = text[text.map(lambda value: isinstance(value, str))]
+    if text.empty:
+        return pd.to_datetime(series, errors='coerce')
+
+    fmt = _departure_time_format(text.iloc[0].strip())
+    if fmt is None:
+        return pd.to_datetime(series, errors='coerce', format='mixed')
+
+    parsed = pd.to_datetime(series, errors='coerce', format=fmt)
+
+    # Odd rows that don't match the common format fall back to per-value parsing
+    leftover = parsed.isna() & series.notna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(series[leftover], errors='coerce', format='mixed')
+    return parsed
+
+
+def _to_seconds(value):
+    """Convert a timing cell ('1:25', '0:01:25', time, timedelta) to seconds"""
+    if isinstance(value, dt_time):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    if isinstance(value, pd.Timedelta) or hasattr(value, 'total_seconds'):
+        return value.total_seconds()
+    if isinstance(value, str):
+        parts = value.strip().split(':')
+        try:
+            seconds = 0.0
+            for part in parts:
+                seconds = seconds * 60 + float(part)
+            return seconds
+        except ValueError:
+            return np.nan
+    return np.nan
+
+
+def _small_int(series):
+    """Downcast a numeric series to the smallest nullable integer type"""
+    values = series.round()
+    if values.notna().any():
+        low, high = values.min(), values.max()
+    else:
+        low = high = 0
+    for dtype, info in (('Int8', np.iinfo(np.int8)), ('Int16', np.iinfo(np.int16)), ('Int32', np.iinfo(np.int32))):
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values.astype('Int64')
+
+
+def to_typed_schema(df):
+    """
+    Convert a transformed frame to the compact typed schema
+
+    - Store Name, Daypart and Event Name as categoricals
+    - Departure Time as datetime64
+    - Cars in Queue and the timing columns as small integers (seconds)
+
+    Args:
+        df: DataFrame returned by transform_raw_car_data
+
+    Returns:
+        New DataFrame with the same columns and rows
+    """
+    typed = df.copy()
+
+    for col in CATEGORY_COLUMNS:
+        if col in typed:
+            typed[col] = typed[col].astype('category')
+
+    if 'Departure Time' in typed:
+        typed['Departure Time'] = parse_departure_times(typed['Departure Time'])
+
+    for col in COUNT_COLUMNS + TIMING_COLUMNS:
+        if col not in typed:
+            continue
+        numeric = pd.to_numeric(typed[col], errors='coerce')
+        unparsed = numeric.isna() & typed[col].notna()
+        if unparsed.any():
+            numeric[unparsed] = typed[col][unparsed].map(_to_seconds)
+        typed[col] = _small_int(numeric.astype(float))
+
+    return typed
+
+
+def _convert_cell_value(value):
+    """Convert a raw openpyxl value the same way pd.read_excel does"""
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in EXCEL_ERROR_CODES:
+        return np.nan
+    return value
+
+
+def _read_pandas(input_file, layout=RAW_LAYOUT, excel_engine=None):
+    """
+    Read the whole sheet with pd.read_excel (original reader)
+
+    Returns:
+        Tuple of (store_name, DataFrame of mapped columns)
+    """
+    raw_df = pd.read_excel(open_stream(input_file), sheet_name=0, header=None, engine=excel_engine)
+
+    # Extract store name from row 3, column 1
+    store_name = raw_df.iloc[layout['store_cell']] if layout['store_cell'] else np.nan
+
+    # Slice all mapped columns from row 7 down in one operation
+    df = raw_df.iloc[layout['data_start_row']:, list(layout['columns'])]
+    df.columns = list(layout['columns'].values())
+
+    # Re-infer dtypes per column (raw sheet columns are mixed object)
+    return store_name, df.reset_index(drop=True).infer_objects()
+
+
+def iter_raw_car_batches(input_file, batch_size=STREAM_BATCH_SIZE, layout=RAW_LAYOUT):
+    """
+    Stream the raw sheet once, keeping only the mapped columns
+
+    Uses openpyxl read-only mode, so only one batch of pruned rows is
+    held in memory at a time no matter how large the export is.
+
+    Args:
+        input_file: Path to raw Excel file from HMECloud
+        batch_size: Number of data rows per yielded batch
+        layout: Sheet layout (RAW_LAYOUT or one returned by detect_layout)
+
+    Yields:
+        Tuples of (store_name, DataFrame) - object dtype, mapped column names
+    """
+    from openpyxl import load_workbook
+
+    column_indexes = list(layout['columns'])
+    column_names = list(layout['columns'].values())
+    store_row, store_col = layout['store_cell'] or (-1, -1)
+    data_start_row = layout['data_start_row']
+
+    wb = load_workbook(open_stream(input_file), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+
+        store_name = np.nan
+        batch = []
+        for row_idx, row in enumerate(ws.iter_rows(values_only=True)):
+            if row_idx == store_row and store_col < len(row):
+                store_name = _convert_cell_value(row[store_col])
+            if row_idx < data_start_row:
+                continue
+
+            width = len(row)
+            batch.append([
+                _convert_cell_value(row[col_idx]) if col_idx < width else np.nan
+                for col_idx in column_indexes
+            ])
+
+            if len(batch) >= batch_size:
+                yield store_name, pd.DataFrame(batch, columns=column_names, dtype=object)
+                batch = []
+
+        if batch:
+            yield store_name, pd.DataFrame(batch, columns=column_names, dtype=object)
+    finally:
+        wb.close()
+
+
+def _read_streaming(input_file, layout=RAW_LAYOUT, batch_size=STREAM_BATCH_SIZE):
+    """
+    Read the mapped columns with the streaming reader
+
+    Returns:
+        Tuple of (store_name, DataFrame of mapped columns)
+    """
+    store_name = np.nan
+    batches = []
+    for store_name, batch in iter_raw_car_batches(input_file, batch_size, layout):
+        batches.append(batch)
+
+    if not batches:
+        return store_name, pd.DataFrame(columns=list(layout['columns'].values()))
+
+    df = pd.concat(batches, ignore_index=True)
+
+    # Infer each column on its own, as read_excel does for the raw sheet
+    return store_name, pd.DataFrame({name: df[name].infer_objects() for name in df.columns})
+
+
+def _column_index(reference):
+    """Convert a cell reference such as 'AB12' to a 0-based column index"""
+    index = 0
+    for char in reference:
+        if char.isdigit():
+            break
+        index = index * 26 + (ord(char.upper()) - 64)
+    return index - 1
+
+
+def _first_sheet_member(xlsx):
+    """Resolve the zip member of the first worksheet (what sheet_name=0 reads)"""
+    try:
+        workbook = ET.fromstring(xlsx.member('xl/workbook.xml'))
+        first_sheet = workbook.find(f'{SHEET_NS}sheets/{SHEET_NS}sheet')
+        rel_id = first_sheet.get(f'{REL_NS}id')
+
+        rels = ET.fromstring(xlsx.member('xl/_rels/workbook.xml.rels'))
+        for rel in rels.iter(f'{PACKAGE_REL_NS}Relationship'):
+            if rel.get('Id') == rel_id:
+                target = rel.get('Target')
+                if target.startswith('/'):
+                    return target.lstrip('/')
+                return posixpath.normpath(posixpath.join('xl', target))
+    except (KeyError, AttributeError, ET.ParseError):
+        pass
+
+    return DEFAULT_SHEET_MEMBER
+
+
+def _load_shared_strings(xlsx):
+    """Read sharedStrings.xml into a list (plain text, rich-text runs joined)"""
+    try:
+        source = xlsx.open_member('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+
+    strings = []
+    text_tag = f'{SHEET_NS}t'
+    run_text_path = f'{SHEET_NS}r/{SHEET_NS}t'
+    with source:
+        for _, element in ET.iterparse(source):
+            if element.tag == f'{SHEET_NS}si':
+                parts = element.findall(text_tag) + element.findall(run_text_path)
+                strings.append(''.join(part.text or '' for part in parts))
+                element.clear()
+
+    return strings
+
+
+def _load_date_styles(xlsx):
+    """
+    Find which cell styles format numbers as dates
+
+    Returns:
+        Tuple of (date_style_ids, timedelta_style_ids, epoch)
+    """
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+    date_styles = set()
+    timedelta_styles = set()
+
+    try:
+        styles = ET.fromstring(xlsx.member('xl/styles.xml'))
+    except KeyError:
+        styles = None
+
+    if styles is not None:
+        custom_formats = {
+            int(fmt.get('numFmtId')): fmt.get('formatCode')
+            for fmt in styles.iter(f'{SHEET_NS}numFmt')
+        }
+        cell_xfs = styles.find(f'{SHEET_NS}cellXfs')
+        for style_id, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            fmt_id = int(xf.get('numFmtId', 0))
+            fmt = custom_formats.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+            if fmt and is_date_format(fmt):
+                date_styles.add(style_id)
+            if fmt and is_timedelta_format(fmt):
+                timedelta_styles.add(style_id)
+
+    epoch = CALENDAR_WINDOWS_1900
+    try:
+        workbook = ET.fromstring(xlsx.member('xl/workbook.xml'))
+        workbook_pr = workbook.find(f'{SHEET_NS}workbookPr')
+        if workbook_pr is not None and workbook_pr.get('date1904') in ('1', 'true'):
+            epoch = CALENDAR_MAC_1904
+    except KeyError:
+        pass
+
+    return date_styles, timedelta_styles, epoch
+
+
+def _parse_cell(cell, shared_strings, date_styles, timedelta_styles, epoch):
+    """Decode one <c> element to the value openpyxl would return"""
+    data_type = cell.get('t', 'n')
+
+    if data_type == 'inlineStr':
+        parts = cell.findall(f'{SHEET_NS}is/{SHEET_NS}t') + cell.findall(f'{SHEET_NS}is/{SHEET_NS}r/{SHEET_NS}t')
+        return _convert_cell_value(''.join(part.text or '' for part in parts) if parts else None)
+
+    value = cell.findtext(f'{SHEET_NS}v') or None
+    if value is None or data_type == 'e':
+        return np.nan
+
+    if data_type == 's':
+        return _convert_cell_value(shared_strings[int(value)])
+    if data_type == 'b':
+        return bool(int(value))
+    if data_type == 'str':
+        return _convert_cell_value(value)
+    if data_type == 'd':
+        from openpyxl.utils.datetime import from_ISO8601
+        return from_ISO8601(value)
+
+    number = float(value) if ('.' in value or 'E' in value or 'e' in value) else int(value)
+    style_id = int(cell.get('s', 0))
+    if style_id in date_styles:
+        from openpyxl.utils.datetime import from_excel
+        try:
+            return from_excel(number, epoch, timedelta=style_id in timedelta_styles)
+        except (OverflowError, ValueError):
+            return np.nan
+
+    return _convert_cell_value(number)
+
+
+def _parse_sheet_rows(source, layout, shared_strings, date_styles, timedelta_styles, epoch, first_row=0):
+    """
+    Parse the <row> elements of sheet XML into per-column value lists
+
+    Args:
+        source: File object with worksheet XML (a whole sheet or one chunk)
+        layout: Reader layout
+        shared_strings, date_styles, timedelta_styles, epoch: Workbook context
+        first_row: Row index assumed for a leading row without an r attribute;
+            None to require row references (chunks can't infer their offset)
+
+    Returns:
+        Tuple of (store_name, row indices, per-column value lists)
+    """
+    column_positions = {col_idx: pos for pos, col_idx in enumerate(layout['columns'])}
+    columns = [[] for _ in layout['columns']]
+    row_indices = []
+    store_row, store_col = layout['store_cell'] or (-1, -1)
+    data_start_row = layout['data_start_row']
+    store_name = np.nan
+
+    row_tag = f'{SHEET_NS}row'
+    cell_tag = f'{SHEET_NS}c'
+    column_cache = {}
+    next_row = first_row
+
+    for _, element in ET.iterparse(source):
+        if element.tag != row_tag:
+            continue
+
+        row_ref = element.get('r')
+        if row_ref:
+            row_idx = int(row_ref) - 1
+        elif next_row is None:
+            raise ValueError("Row without a reference in a sheet chunk")
+        else:
+            row_idx = next_row
+        next_row = row_idx + 1
+
+        if row_idx < data_start_row and row_idx != store_row:
+            element.clear()
+            continue
+
+        values = [np.nan] * len(columns)
+        col_idx = -1
+        for cell in element.iter(cell_tag):
+            ref = cell.get('r')
+            if ref:
+                letters = ref.rstrip('0123456789')
+                col_idx = column_cache.get(letters)
+                if col_idx is None:
+                    col_idx = column_cache[letters] = _column_index(letters)
+            else:
+                col_idx += 1
+
+            if row_idx == store_row and col_idx == store_col:
+                store_name = _parse_cell(cell, shared_strings, date_styles, timedelta_styles, epoch)
+
+            pos = column_positions.get(col_idx)
+            if pos is not None and row_idx >= data_start_row:
+                values[pos] = _parse_cell(cell, shared_strings, date_styles, timedelta_styles, epoch)
+        element.clear()
+
+        if row_idx < data_start_row:
+            continue
+
+        row_indices.append(row_idx)
+        for pos, value in enumerate(values):
+            columns[pos].append(value)
+
+    return store_name, row_indices, columns
+
+
+def _rows_to_frame(row_indices, columns, layout):
+    """
+    Build the mapped-column frame from parsed rows
+
+    Rows missing from the XML are empty rows in the sheet, so every row
+    from data_start_row to the last parsed row gets a slot.
+    """
+    data_start_row = layout['data_start_row']
+    n_rows = max(row_indices) - data_start_row + 1 if row_indices else 0
+    positions = np.asarray(row_indices, dtype=np.int64) - data_start_row
+
+    frame = {}
+    for pos, name in enumerate(layout['columns'].values()):
+        values = np.full(n_rows, np.nan, dtype=object)
+        if n_rows:
+            values[positions] = columns[pos]
+        frame[name] = pd.Series(values, dtype=object).infer_objects()
+    return pd.DataFrame(frame)
+
+
+def _split_sheet_xml(data, chunk_count):
+    """
+    Split worksheet XML into chunk_count well-formed documents at <row> boundaries
+
+    Each chunk keeps the original root start tag (and everything up to
+    <sheetData>) so namespaces resolve, followed by a slice of rows.
+
+    Returns:
+        List of XML byte strings - a single chunk if the sheet can't be split
+    """
+    sheet_data = data.find(b'<sheetData')
+    if sheet_data < 0 or chunk_count < 2:
+        return [data]
+    rows_start = data.index(b'>', sheet_data) + 1
+    rows_end = data.rfind(b'</sheetData>')
+    if rows_end < rows_start:
+        return [data]
+
+    head, tail = data[:rows_start], data[rows_end:]
+    step = (rows_end - rows_start) // chunk_count
+
+    boundaries = [rows_start]
+    for k in range(1, chunk_count):
+        boundary = data.find(b'<row', max(rows_start + k * step, boundaries[-1] + 1), rows_end)
+        while boundary >= 0 and data[boundary + 4:boundary + 5] not in (b' ', b'>'):
+            boundary = data.find(b'<row', boundary + 4, rows_end)
+        if boundary < 0:
+            break
+        boundaries.append(boundary)
+    boundaries.append(rows_end)
+
+    return [head + data[start:end] + tail for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+# Workbook context of a parallel-parse worker (set by _init_sheet_worker)
+_sheet_worker_context = None
+
+
+def _init_sheet_worker(layout, shared_strings, date_styles, timedelta_styles, epoch):
+    """Process pool initializer - ship shared strings and styles once per worker"""
+    global _sheet_worker_context
+    _sheet_worker_context = (layout, shared_strings, date_styles, timedelta_styles, epoch)
+
+
+def _parse_sheet_chunk(chunk):
+    """Parse one sheet chunk in a worker process"""
+    layout, shared_strings, date_styles, timedelta_styles, epoch = _sheet_worker_context
+    return _parse_sheet_rows(
+        io.BytesIO(chunk), layout, shared_strings, date_styles, timedelta_styles, epoch, first_row=None
+    )
+
+
+def _parse_sheet_parallel(data, layout, context, workers):
+    """
+    Parse worksheet XML in row-range chunks across worker processes
+
+    Chunk results are stitched back in sheet order before any forward
+    fill runs, so Daypart and Store Name carry across chunk edges exactly
+    as in a single-pass parse.
+
+    Returns:
+        Tuple of (store_name, row indices, per-column value lists),
+        or None if the sheet can't be parsed in chunks
+    """
+    chunks = _split_sheet_xml(data, workers * PARALLEL_PARSE_CHUNKS_PER_WORKER)
+    if len(chunks) < 2:
+        return None
+    del data
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_sheet_worker,
+                             initargs=(layout, *context)) as executor:
+        try:
+            results = list(executor.map(_parse_sheet_chunk, chunks))
+        except ValueError:
+            return None
+
+    store_name = np.nan
+    row_indices = []
+    columns = [[] for _ in layout['columns']]
+    for chunk_store, chunk_rows, chunk_columns in results:
+        if pd.isna(store_name) and not pd.isna(chunk_store):
+            store_name = chunk_store
+        row_indices.extend(chunk_rows)
+        for pos, values in enumerate(chunk_columns):
+            columns[pos].extend(values)
+
+    return store_name, row_indices, columns
+
+
+def _read_xml(input_file, layout=RAW_LAYOUT):
+    """
+    Read the mapped columns straight from the sheet XML
+
+    Skips the openpyxl/pandas object model entirely: the worksheet and
+    sharedStrings.xml are streamed from the shared mapping (see
+    xlsx_access.open_members) with ET.iterparse and cells are placed by
+    their reference into per-column lists.
+
+    Sheets larger than PARALLEL_PARSE_BYTES (uncompressed) are split at
+    <row> boundaries and parsed by PARALLEL_PARSE_WORKERS processes.
+
+    Returns:
+        Tuple of (store_name, DataFrame of mapped columns)
+    """
+    with open_members(input_file) as xlsx:
+        shared_strings = _load_shared_strings(xlsx)
+        context = (shared_strings, *_load_date_styles(xlsx))
+        sheet_member = _first_sheet_member(xlsx)
+
+        parsed = None
+        workers = PARALLEL_PARSE_WORKERS or 1
+        if workers > 1 and xlsx.member_size(sheet_member) >= PARALLEL_PARSE_BYTES:
+            # Chunks are pickled to the workers, so the sheet is needed as bytes
+            sheet = bytes(xlsx.member(sheet_member, cache=False))
+            parsed = _parse_sheet_parallel(sheet, layout, context, workers)
+            del sheet
+
+        if parsed is None:
+            with xlsx.open_member(sheet_member) as source:
+                parsed = _parse_sheet_rows(source, layout, *context)
+
+    store_name, row_indices, columns = parsed
+    return store_name, _rows_to_frame(row_indices, columns, layout)
+
+
+def _read_calamine(input_file, layout=RAW_LAYOUT):
+    """Read the whole sheet with pd.read_excel on the Rust calamine reader"""
+    return _read_pandas(input_file, layout, excel_engine='calamine')
+
+
+# Registry of reader engines: name -> {'reader': fn, 'requires': module or None}
+READER_ENGINES = {}
+
+
+def register_reader_engine(name, reader, requires=None):
+    """
+    Register a reader engine for transform_raw_car_data
+
+    Args:
+        name: Engine name used by the engine argument / HME_READER_ENGINE
+        reader: Callable(input_file, layout) -> (store_name, DataFrame of mapped columns)
+        requires: Optional module that must be importable for the engine to run
+    """
+    READER_ENGINES[name] = {'reader': reader, 'requires': requires}
+
+
+def available_reader_engines():
+    """List registered engines whose optional dependency is installed"""
+    return [
+        name for name, entry in READER_ENGINES.items()
+        if entry['requires'] is None or importlib.util.find_spec(entry['requires']) is not None
+    ]
+
+
+def _source_size(input_file):
+    """Size in bytes of a path or an in-memory buffer (0 if unknown)"""
+    if hasattr(input_file, 'getbuffer'):
+        return input_file.getbuffer().nbytes
+    if hasattr(input_file, 'seek'):
+        position = input_file.tell()
+        size = input_file.seek(0, io.SEEK_END)
+        input_file.seek(position)
+        return size
+    try:
+        return os.path.getsize(input_file)
+    except (OSError, TypeError):
+        return 0
+
+
+def source_name(input_file):
+    """Printable name of a path or a buffer (buffers may carry a .name)"""
+    return getattr(input_file, 'name', None) or str(input_file)
+
+
+def select_reader_engine(input_file):
+    """
+    Pick the fastest available engine for a file
+
+    Calamine is fastest whenever it is installed; above LARGE_FILE_BYTES
+    the column-pruned engines go first so the full sheet is never held
+    in memory.
+    """
+    size = _source_size(input_file)
+
+    preference = LARGE_FILE_ENGINE_PREFERENCE if size >= LARGE_FILE_BYTES else ENGINE_PREFERENCE
+    available = available_reader_engines()
+    for name in preference + available:
+        if name in available:
+            return name
+
+    raise RuntimeError("No reader engine available")
+
+
+register_reader_engine('pandas', _read_pandas)
+register_reader_engine('streaming', _read_streaming)
+register_reader_engine('xml', _read_xml)
+register_reader_engine('calamine', _read_calamine, requires='python_calamine')
+
+
+def _normalized_text(series):
+    """Lower-cased, stripped text of a column, for vectorized label matching"""
+    return series.astype(str).str.strip().str.lower()
+
+
+def split_store_blocks(df, store_name):
+    """
+    Split a raw sheet scan into store/day blocks with vectorized masks
+
+    Every block repeats the raw layout: a header row ('Daypart' /
+    'Departure Time') with its store name in column B three rows above.
+    One pass over columns A-C marks the headers, numbers the blocks with
+    a cumulative sum and drops each block's preamble and header rows.
+
+    Args:
+        df: Reader output for RAW_SCAN_LAYOUT (every sheet row, column B included)
+        store_name: Store from B4, used if no header row is found
+
+    Returns:
+        DataFrame of data rows with 'Store Name' and a block number column
+    """
+    header_row = DATA_START_ROW - 1
+    store_offset = header_row - STORE_NAME_CELL[0]
+
+    is_header = (
+        (_normalized_text(df['Daypart']) == 'daypart')
+        & (_normalized_text(df['Departure Time']) == 'departure time')
+    )
+
+    if not is_header.any():
+        data = df.iloc[DATA_START_ROW:].drop(columns=SEGMENT_STORE_COLUMN)
+        data.insert(1, 'Store Name', store_name)
+        return data.reset_index(drop=True)
+
+    segment = is_header.cumsum()
+    block_store = df[SEGMENT_STORE_COLUMN].shift(store_offset).where(is_header).ffill()
+
+    # Title/store/brand rows above every header belong to no block
+    preamble = pd.Series(False, index=df.index)
+    for offset in range(1, header_row + 1):
+        preamble |= is_header.shift(-offset, fill_value=False)
+
+    keep = (segment > 0) & ~is_header & ~preamble
+    data = df.loc[keep].drop(columns=SEGMENT_STORE_COLUMN)
+    data.insert(1, 'Store Name', block_store[keep])
+    data[SEGMENT_COLUMN] = segment[keep]
+
+    # Header and preamble text no longer forces columns to object dtype
+    data = data.reset_index(drop=True)
+    return pd.DataFrame({name: data[name].infer_objects() for name in data.columns})
+
+
+def _header_key(value):
+    """Normalise a header cell for comparison"""
+    return str(value).strip().lower() if value is not None else ''
+
+
+def detect_layout(input_file, max_rows=SNIFF_ROWS):
+    """
+    Classify an export from its first few rows, without a full parse
+
+    - 'raw': HME Raw Car Data export (store in B4, header in row 7)
+    - 'dt_converted': already run through the DT macro (header in row 1,
+      Store Name in column B); columns are mapped by header name
+    - 'unknown': anything else
+
+    Args:
+        input_file: Path to Excel file
+        max_rows: Number of leading rows to read
+
+    Returns:
+        Layout dict with a 'name' key; 'raw' and 'dt_converted' layouts can
+        be passed to any reader engine
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(open_stream(input_file), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        rows = [
+            [_header_key(value) for value in row]
+            for row in ws.iter_rows(max_row=max_rows, values_only=True)
+        ]
+    finally:
+        wb.close()
+
+    def cell(row_idx, col_idx):
+        if row_idx < len(rows) and col_idx < len(rows[row_idx]):
+            return rows[row_idx][col_idx]
+        return ''
+
+    header_row = DATA_START_ROW - 1
+    if cell(header_row, 0) == 'daypart' and cell(header_row, 2) == 'departure time':
+        return RAW_LAYOUT
+
+    if rows and cell(0, 0) == 'daypart' and 'store name' in rows[0]:
+        wanted = {_header_key(name): name for name in OUTPUT_COLUMNS}
+        columns = {}
+        for col_idx, value in enumerate(rows[0]):
+            if value in wanted and wanted[value] not in columns.values():
+                columns[col_idx] = wanted[value]
+        return {
+            'name': 'dt_converted',
+            'columns': columns,
+            'store_cell': None,
+            'data_start_row': 1,
+        }
+
+    return {'name': 'unknown'}
+
+
+def transform_raw_car_data(input_file, engine=None, typed=False, layout=None):
+    """
+    Transform raw HME car data to template format
+
+    Args:
+        input_file: Path to raw Excel file from HMECloud, or a BytesIO of one
+        engine: Reader engine - 'pandas', 'streaming' (column-pruned,
+            constant memory), 'xml' (raw sheet XML parser), 'calamine'
+            (if installed) or 'auto'. Defaults to $HME_READER_ENGINE, then 'auto'.
+        typed: Return the compact typed schema (see to_typed_schema)
+        layout: Sheet layout; detected with detect_layout() when omitted, so
+            raw and DT-converted exports can be mixed in one folder
+
+    Returns:
+        DataFrame with transformed data. df.attrs records the engine that
+        ran ('reader_engine') and its read time ('read_seconds').
+    """
+    print(f"\n   Transforming: {source_name(input_file)}")
+
+    if layout is None:
+        layout = detect_layout(input_file)
+    if layout['name'] == 'unknown':
+        raise ValueError(f"Not a Raw Car Data export (raw or DT-converted): {source_name(input_file)}")
+    if layout['name'] != 'raw':
+        missing = [name for name in OUTPUT_COLUMNS if name not in layout['columns'].values()]
+        if missing:
+            raise ValueError(f"DT-converted file is missing columns {missing}: {source_name(input_file)}")
+        print(f"   Layout: {layout['name']}")
+
+    if engine is None:
+        engine = os.environ.get(READER_ENGINE_ENV) or 'auto'
+    if engine == 'auto':
+        engine = select_reader_engine(input_file)
+
+    if engine not in READER_ENGINES:
+        raise ValueError(f"Unknown reader engine '{engine}'. Available: {list(READER_ENGINES)}")
+    if engine not in available_reader_engines():
+        raise ValueError(f"Reader engine '{engine}' needs '{READER_ENGINES[engine]['requires']}' installed")
+
+    # Read raw file
+    started = time.perf_counter()
+    if layout is RAW_LAYOUT:
+        store_name, df = READER_ENGINES[engine]['reader'](input_file, RAW_SCAN_LAYOUT)
+        df = split_store_blocks(df, store_name)
+    else:
+        store_name, df = READER_ENGINES[engine]['reader'](input_file, layout)
+    read_seconds = time.perf_counter() - started
+
+    stores = df['Store Name'].dropna().unique() if 'Store Name' in df else []
+    if len(stores) > 1:
+        print(f"   Stores: {len(stores)} blocks - {', '.join(str(store) for store in stores)}")
+    else:
+        print(f"   Store: {stores[0] if len(stores) else store_name}")
+    print(f"   Reader: {engine} ({read_seconds:.2f}s)")
+
+    df = _finalize_frame(df, store_name)
+    if typed:
+        df = to_typed_schema(df)
+    df.attrs['reader_engine'] = engine
+    df.attrs['read_seconds'] = read_seconds
+
     print(f"   ✅ Transformed {len(df)} rows (ALL rows, not just 197!)")
-    
+
     return df
 
 
+def write_converted_sheet(df, output_file):
+    """
+    Write a transformed frame as a DT-converted workbook
+
+    Same sheet the DT macro leaves behind (header row, then Daypart,
+    Store Name and the timing columns in template order), written in
+    write-only mode and swapped in atomically.
+
+    Args:
+        df: Transformed DataFrame (OUTPUT_COLUMNS)
+        output_file: Path of the workbook to write (may be the raw file itself)
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.column_dimensions['B'].width = 33.29
+    ws.append(OUTPUT_COLUMNS)
+    for row in df[OUTPUT_COLUMNS].itertuples(index=False, name=None):
+        ws.append([None if pd.isna(value) else value for value in row])
+
+    temp_file = output_file + '.converting'
+    wb.save(temp_file)
+    release(output_file)
+    os.replace(temp_file, output_file)
+
+
+def convert_and_transform(input_file, output_file=None, engine=None, write=True):
+    """
+    DT conversion and transform from a single parse
+
+    The raw export is read once; the transformed frame is returned and,
+    if write is set, also written back as the DT-converted sheet - no
+    openpyxl replay of the macro and no second read.
+
+    Args:
+        input_file: Path to raw Excel file from HMECloud
+        output_file: Where to write the converted sheet (default: over input_file)
+        engine: Reader engine passed to transform_raw_car_data
+        write: Write the converted sheet to disk
+
+    Returns:
+        DataFrame with transformed data (df.attrs['converted_file'] set when written)
+    """
+    layout = detect_layout(input_file)
+    df = transform_raw_car_data(input_file, engine, layout=layout)
+
+    if write and layout['name'] == 'raw':
+        output_file = output_file or input_file
+        write_converted_sheet(df, output_file)
+        df.attrs['converted_file'] = output_file
+        print(f"   ✅ DT-converted sheet written: {os.path.basename(output_file)}")
+    return df
+
+
+def transform_raw_car_files(input_files, engine=None, typed=False):
+    """
+    Transform many raw HME files into one DataFrame
+
+    Args:
+        input_files: Iterable of paths to raw Excel files
+        engine: Reader engine passed to transform_raw_car_data
+        typed: Return the compact typed schema (see to_typed_schema)
+
+    Returns:
+        Single DataFrame with the rows of every file, in input order
+    """
+    frames = [transform_raw_car_data(input_file, engine) for input_file in input_files]
+
+    if not frames:
+        df = pd.DataFrame(columns=OUTPUT_COLUMNS)
+    else:
+        df = pd.concat(frames, ignore_index=True)
+
+    # Type after concatenating so categories are shared across stores
+    return to_typed_schema(df) if typed else df
+
+
+def check_engine_output(input_file, engine='xml', reference='pandas'):
+    """
+    Check that a reader engine gives the same frame as the reference engine
+
+    Args:
+        input_file: Path to raw Excel file from HMECloud
+        engine: Engine under test
+        reference: Engine whose output is taken as correct
+
+    Returns:
+        True if both frames are identical, False otherwise
+    """
+    expected = transform_raw_car_data(input_file, reference)
+    actual = transform_raw_car_data(input_file, engine)
+
+    try:
+        pd.testing.assert_frame_equal(actual, expected)
+    except AssertionError as e:
+        print(f"   ❌ '{engine}' differs from '{reference}': {e}")
+        return False
+
+    print(f"   ✅ '{engine}' matches '{reference}' ({len(actual)} rows)")
+    return True
+
+
 if __name__ == "__main__":
     # Test
     test_file = "/Users/sanctum/Desktop/Automation/hme_stores/test.xlsx"
     if os.path.exists(test_file):
         df = transform_raw_car_data(test_file)
         print(df.head())
-
-
-
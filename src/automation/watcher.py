@@ -0,0 +1,296 @@
+"""
+Watch Folder Module
+Converts and transforms exports as soon as they land in the downloads folder
+
+A long-running watcher on data/downloads (inotify on Linux, polling
+elsewhere). Every completed .xlsx is routed by layout, DT-converted if
+configured, transformed (into the transform cache) and spooled for the
+template writer, so the next template commit - from complete_automation,
+the app, or the watcher itself with --commit-after - only has to paste.
+
+USAGE:
+    python3 -m automation.watcher                     # Watch data/downloads
+    python3 -m automation.watcher --commit-after 60   # Also update the template after 60s of quiet
+    python3 -m automation.watcher --poll              # Force the polling fallback
+"""
+
+import os
+import sys
+import glob
+import time
+import select
+import struct
+import argparse
+
+try:
+    import ctypes
+    import ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True) if sys.platform.startswith('linux') else None
+except (ImportError, OSError):
+    _libc = None
+
+from . import pipeline, template_writer
+from .context import RunContext
+from .journal import RunJournal
+from .transform_cache import file_digest
+from .transform_data import detect_layout, parse_departure_times
+from .xlsx_access import release_all
+from .complete_automation import _transform_file, _apply_batch, resolve_target_date
+
+# ========== CONFIGURATION ==========
+POLL_INTERVAL = 1.0         # Seconds between checks (and inotify wakeups)
+SETTLE_SECONDS = 2.0        # Polling: a file must keep its size this long to count as complete
+COMMIT_AFTER = None         # Seconds of quiet before the watcher updates the template itself (None = never)
+# ===================================
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')
+
+
+def is_export(path):
+    """True for a finished export (not a lock file, partial download or our own output)"""
+    name = os.path.basename(path)
+    return name.endswith('.xlsx') and not name.startswith('~$') and not name.endswith('_transformed.xlsx')
+
+
+def export_date(df):
+    """
+    Report date of a staged export: its newest departure day
+
+    Falls back to resolve_target_date() when no Departure Time parses, so
+    a watcher running for days never reuses the day it started on.
+    """
+    departures = parse_departure_times(df['Departure Time']) if 'Departure Time' in df else None
+    if departures is None or departures.isna().all():
+        return resolve_target_date()
+    return departures.max().normalize().to_pydatetime()
+
+
+class InotifySource:
+    """Completed files in a folder, from inotify close-write / moved-to events"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.fd = _libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout):
+        """Paths completed within timeout seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                paths.append(os.path.join(self.folder, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Completed files in a folder, by watching sizes settle"""
+
+    def __init__(self, folder, settle=SETTLE_SECONDS):
+        self.folder = folder
+        self.settle = settle
+        self.sizes = {}             # Path -> (size, mtime, first seen with that size)
+        self.reported = {}          # Path -> (size, mtime) when last reported
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        now = time.time()
+        paths = []
+        current = set(glob.glob(os.path.join(self.folder, "*.xlsx")))
+        for path in current:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            previous = self.sizes.get(path)
+            if previous is None or previous[:2] != signature:
+                self.sizes[path] = signature + (now,)
+            elif now - previous[2] >= self.settle and self.reported.get(path) != signature:
+                self.reported[path] = signature
+                paths.append(path)
+        for path in set(self.sizes) - current:
+            self.sizes.pop(path, None)
+            self.reported.pop(path, None)
+        return paths
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """Stage every export that lands in a run context's downloads folder"""
+
+    def __init__(self, ctx=None, commit_after=COMMIT_AFTER, use_inotify=True):
+        self.ctx = ctx or RunContext.default()
+        self.commit_after = commit_after
+        self.use_inotify = use_inotify and _libc is not None
+        self.handled = set()        # Content hashes already staged (or skipped)
+        self.staged = []            # Spooled job ids not yet committed
+        self.last_staged = None
+
+    def _source(self):
+        if self.use_inotify:
+            try:
+                return InotifySource(self.ctx.downloads_folder)
+            except OSError as e:
+                print(f"   ⚠️  inotify unavailable ({e}) - polling instead")
+        return PollingSource(self.ctx.downloads_folder)
+
+    def process(self, path):
+        """
+        Convert, transform and spool one completed export
+
+        Returns:
+            True if the file was staged
+        """
+        if not is_export(path) or not os.path.exists(path):
+            return False
+        try:
+            return self._stage(path)
+        finally:
+            # Hashing and reading mapped the export - don't keep it for the life of the watcher
+            release_all()
+
+    def _stage(self, path):
+        name = os.path.basename(path)
+        digest = file_digest(path)
+        if digest in self.handled:
+            return False
+        self.handled.add(digest)
+
+        if digest in RunJournal(self.ctx.template_path).consumed_files():
+            print(f"   ⏭️  {name}: already pasted into the template")
+            return False
+
+        started = time.time()
+        layout = detect_layout(path)
+        if layout['name'] == 'unknown':
+            print(f"   ⚠️  Skipping {name}: not a Raw Car Data export")
+            return False
+        if layout['name'] == 'raw' and pipeline.CONVERT_WITH_DT_MACRO:
+            from .run_macro import run_dt_macro
+            if run_dt_macro(path):
+                # The macro rewrote the file - its close-write event is ours
+                digest = file_digest(path)
+                self.handled.add(digest)
+            else:
+                print(f"   ⚠️  DT macro failed for {name} - using raw layout")
+
+        try:
+            df = _transform_file(path)
+        except Exception as e:
+            print(f"   ❌ {name}: {e}")
+            return False
+        df.attrs['source_file'] = path
+        self.ctx.add_converted(path)
+
+        report_date = export_date(df)
+        job_id = template_writer.spool_job(self.ctx.template_path, {
+            'name': f"{self.ctx.name} (watcher)",
+            'frames': [df],
+            'file_digests': {path: digest},
+            'target_date': report_date,
+            'start_date': None,
+        })
+        self.staged.append(job_id)
+        self.last_staged = time.time()
+        print(f"   📥 {name}: {len(df)} rows for {report_date:%Y-%m-%d} staged in {time.time() - started:.1f}s")
+        return True
+
+    def commit(self):
+        """
+        Paste everything staged so far (skipped if another run holds the template)
+
+        Returns:
+            True if a batch was written
+        """
+        with template_writer.template_lock(self.ctx.template_path, blocking=False) as acquired:
+            if not acquired:
+                return False
+            if template_writer.pending_jobs(self.ctx.template_path):
+                template_writer.serve(
+                    self.ctx.template_path, lambda collect: _apply_batch(self.ctx, collect), window=0
+                )
+
+        rows = 0
+        for job_id in self.staged:
+            result = template_writer.take_result(self.ctx.template_path, job_id)
+            if result and result['success']:
+                rows += result['rows_added']
+        print(f"   💾 Template updated with {rows} staged rows")
+        self.staged = []
+        return True
+
+    def run(self, stop_after=None):
+        """
+        Watch until interrupted (or for stop_after seconds)
+
+        Files already in the folder are staged first.
+        """
+        folder = self.ctx.downloads_folder
+        os.makedirs(folder, exist_ok=True)
+        source = self._source()
+
+        print("="*80)
+        print("👀 WATCHING FOR DOWNLOADS")
+        print("="*80)
+        print(f"Folder: {folder}")
+        print(f"Mode: {'inotify' if isinstance(source, InotifySource) else 'polling'}")
+        if self.commit_after:
+            print(f"Template update after {self.commit_after}s without new files")
+        print("="*80)
+
+        for path in sorted(glob.glob(os.path.join(folder, "*.xlsx"))):
+            self.process(path)
+
+        started = time.time()
+        try:
+            while stop_after is None or time.time() - started < stop_after:
+                for path in source.wait(POLL_INTERVAL):
+                    self.process(path)
+                if (self.commit_after and self.staged
+                        and time.time() - self.last_staged >= self.commit_after):
+                    self.commit()
+        except KeyboardInterrupt:
+            print("\n🛑 Watcher stopped")
+        finally:
+            source.close()
+
+
+def main(argv=None):
+    """Command line interface"""
+    parser = argparse.ArgumentParser(description="Stage drive-thru exports as soon as they are downloaded")
+    parser.add_argument("--folder", help="Folder to watch (default: data/downloads)")
+    parser.add_argument("--commit-after", type=float, default=COMMIT_AFTER,
+                        help="Update the template after this many seconds without new files")
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    args = parser.parse_args(argv)
+
+    ctx = RunContext.default(name='watcher', downloads_folder=args.folder)
+    FolderWatcher(ctx, commit_after=args.commit_after, use_inotify=not args.poll).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Shared XLSX Access Module
+Memory-maps each workbook once and serves it to every reader in the run
+
+Raw exports, the template and its backups are opened by pandas, openpyxl,
+zipfile and the backup copy. Going through open_stream() / copy_file()
+means the file is read from disk once per run; every further open is a
+view over the same mapping.
+
+The XML reader goes one step further and takes zip members from
+open_members(): stored members are zero-copy slices of the mapping and
+the small workbook parts (workbook.xml, rels, styles) are decompressed
+once per run. Deflated worksheets are streamed, not cached.
+
+Writers must call release(path) before replacing a mapped file.
+"""
+
+import io
+import os
+import mmap
+import shutil
+import struct
+import zipfile
+import threading
+import contextlib
+
+# Local file header: signature, versions, flags, sizes ... (30 bytes fixed)
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+_mapped_files = {}
+_lock = threading.Lock()
+
+
+class MappedReader(io.RawIOBase):
+    """Seekable read-only file object over a shared mapping (own position)"""
+
+    def __init__(self, view, name=None):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+        self.name = name
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("Negative seek position")
+        self._pos = pos
+        return pos
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end].tobytes() if end > self._pos else b''
+        self._pos = max(self._pos, end)
+        return data
+
+    def readinto(self, buffer):
+        # Straight from the mapping into the caller's buffer
+        end = min(self._pos + len(buffer), len(self._view))
+        size = max(0, end - self._pos)
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def readall(self):
+        return self.read()
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._view.release()
+            except BufferError:
+                pass
+        super().close()
+
+
+class MappedXlsx:
+    """One memory-mapped xlsx file with cached zip member access"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if stat.st_size:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self._mmap)
+            else:
+                self._mmap = None
+                self.view = memoryview(b'')
+        self._members = {}
+        self._infos = None
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Member access over an in-memory export (a view of the BytesIO, not a copy)"""
+        mapped = cls.__new__(cls)
+        mapped.path = getattr(buffer, 'name', None)
+        mapped.stamp = None
+        mapped._mmap = None
+        mapped.view = buffer.getbuffer() if hasattr(buffer, 'getbuffer') else memoryview(buffer.read())
+        mapped._members = {}
+        mapped._infos = None
+        return mapped
+
+    def open(self):
+        """New independent file object over the mapping"""
+        view = memoryview(self._mmap) if self._mmap is not None else self.view[:]
+        return MappedReader(view, self.path)
+
+    def member_infos(self):
+        """ZipInfo for every member, keyed by name"""
+        if self._infos is None:
+            with zipfile.ZipFile(self.open()) as zf:
+                self._infos = {info.filename: info for info in zf.infolist()}
+        return self._infos
+
+    def member_size(self, name):
+        """Uncompressed size of a zip member (KeyError if it doesn't exist)"""
+        return self.member_infos()[name].file_size
+
+    def _stored_view(self, name):
+        """Zero-copy slice of a stored (uncompressed) member, or None"""
+        info = self.member_infos()[name]
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+            return None
+        header = _LOCAL_HEADER.unpack_from(self.view, info.header_offset)
+        if header[0] != _LOCAL_HEADER_SIGNATURE:
+            return None
+        name_length, extra_length = header[-2], header[-1]
+        start = info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+        return self.view[start:start + info.file_size]
+
+    def member(self, name, cache=True):
+        """
+        Contents of a zip member
+
+        Stored (uncompressed) members are returned as zero-copy memoryview
+        slices of the mapping; deflated members are decompressed (and kept
+        for the rest of the run unless cache is False).
+        """
+        if name in self._members:
+            return self._members[name]
+
+        data = self._stored_view(name)
+        if data is None:
+            with zipfile.ZipFile(self.open()) as zf:
+                data = zf.read(name)
+        if cache:
+            self._members[name] = data
+        return data
+
+    def open_member(self, name):
+        """
+        File object over a zip member, for streaming parsers
+
+        Stored members are read straight from the mapping; deflated ones
+        are decompressed as they are read.
+        """
+        if name in self._members:
+            return MappedReader(memoryview(self._members[name]), name)
+        data = self._stored_view(name)
+        if data is not None:
+            return MappedReader(data, name)
+        # The member stream keeps the archive's file object open after zf goes
+        return zipfile.ZipFile(self.open()).open(name)
+
+    def close(self):
+        self._members.clear()
+        try:
+            self.view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            # A reader still holds a view; the mapping is freed with it
+            pass
+
+
+def _key(path):
+    return os.path.realpath(os.fspath(path))
+
+
+def open_xlsx(path):
+    """
+    Get the shared mapping for a file (mapped on first use)
+
+    The mapping is replaced automatically if the file changed on disk.
+    """
+    key = _key(path)
+    with _lock:
+        mapped = _mapped_files.get(key)
+        if mapped is not None:
+            stat = os.stat(key)
+            if mapped.stamp != (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+                mapped.close()
+                mapped = None
+        if mapped is None:
+            mapped = _mapped_files[key] = MappedXlsx(key)
+        return mapped
+
+
+def open_stream(path_or_buffer):
+    """
+    File object for pd.read_excel / openpyxl.load_workbook / zipfile.ZipFile
+
+    Paths are served from the shared mapping; file objects (e.g. BytesIO)
+    are returned unchanged.
+    """
+    if hasattr(path_or_buffer, 'read'):
+        return path_or_buffer
+    return open_xlsx(path_or_buffer).open()
+
+
+@contextlib.contextmanager
+def open_members(path_or_buffer):
+    """
+    Zip member access (MappedXlsx) for a path or an in-memory export
+
+    Paths use the shared mapping; a buffer gets a view of its own that is
+    released on exit.
+    """
+    if not hasattr(path_or_buffer, 'read'):
+        yield open_xlsx(path_or_buffer)
+        return
+    mapped = MappedXlsx.from_buffer(path_or_buffer)
+    try:
+        yield mapped
+    finally:
+        mapped.close()
+
+
+def read_bytes_view(path):
+    """Zero-copy view of the whole file (for hashing)"""
+    return open_xlsx(path).view
+
+
+def copy_file(src, dst):
+    """Copy a file from its mapping (like shutil.copy2, without re-reading src)"""
+    mapped = open_xlsx(src)
+    with open(dst, 'wb') as f:
+        f.write(mapped.view)
+    shutil.copystat(mapped.path, dst)
+    return dst
+
+
+def release(path):
+    """Drop the mapping of a file before it is overwritten"""
+    with _lock:
+        mapped = _mapped_files.pop(_key(path), None)
+    if mapped is not None:
+        mapped.close()
+
+
+def release_all():
+    """Drop every mapping (end of run)"""
+    with _lock:
+        mapped_files = list(_mapped_files.values())
+        _mapped_files.clear()
+    for mapped in mapped_files:
+        mapped.close()
@@ -0,0 +1,121 @@
+"""
+Every registered reader engine must give the reference engine's frame
+for each export layout
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.append(str(SRC_DIR))
+
+from automation import transform_data
+from automation.transform_data import (
+    COLUMN_MAPPING,
+    OUTPUT_COLUMNS,
+    available_reader_engines,
+    check_engine_output,
+)
+
+DAY = datetime(2025, 11, 4)
+DAYPARTS = ['6:00AM - 10:59AM', '11:00AM - 1:59PM', '2:00PM - 4:59PM']
+RAW_WIDTH = max(COLUMN_MAPPING) + 1
+
+
+def events(store, rows):
+    """Rows of one store's day: the daypart is only on each daypart's first row"""
+    start = DAY + timedelta(hours=6)
+    for i in range(rows):
+        daypart = DAYPARTS[i * len(DAYPARTS) // rows]
+        first = i == 0 or daypart != DAYPARTS[(i - 1) * len(DAYPARTS) // rows]
+        departure = start + timedelta(seconds=45 * i)
+        yield {
+            'Daypart': daypart if first else None,
+            'Store Name': store,
+            'Departure Time': departure.strftime('%m/%d/%Y %I:%M:%S %p'),
+            'Event Name': 'Car_Departure',
+            'Cars in Queue': i % 4,
+            'Menu Board': 30 + i % 7,
+            'Greet': 20 + i % 5,
+            'Service': 100 + i % 11,
+            'Lane Queue': 10 + i % 3,
+            'Lane Total': 200 + i % 13,
+            'Lane Total 2': 250 + i % 17,
+        }
+
+
+def append_raw_block(ws, store, rows):
+    """One store/day block of a Raw Car Data export (store in B4, header in row 7)"""
+    def row(cells):
+        values = [None] * RAW_WIDTH
+        for col, value in cells.items():
+            values[col] = value
+        ws.append(values)
+
+    row({0: 'Raw Car Data Report'})
+    row({})
+    row({})
+    row({0: 'Store:', 1: store, 3: 'Start Time:', 5: DAY.strftime('%b %d, %Y 06:00 AM')})
+    row({0: 'Brand:', 1: 'KFC'})
+    row({})
+    row(dict(COLUMN_MAPPING))
+    for event in events(store, rows):
+        row({col: event[name] for col, name in COLUMN_MAPPING.items()})
+
+
+def write_raw(path, stores_rows):
+    wb = Workbook()
+    for store, rows in stores_rows:
+        append_raw_block(wb.active, store, rows)
+    wb.save(path)
+    return str(path)
+
+
+def write_dt_converted(path, store, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(OUTPUT_COLUMNS)
+    for i, event in enumerate(events(store, rows)):
+        # The DT macro only fills the store down part of the way
+        ws.append([event[name] if name != 'Store Name' or i < 5 else None for name in OUTPUT_COLUMNS])
+    wb.save(path)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    monkeypatch.setattr(transform_data, 'PARALLEL_PARSE_WORKERS', 1)
+
+
+@pytest.fixture
+def exports(tmp_path):
+    return {
+        'raw': write_raw(tmp_path / "raw.xlsx", [("5 Mandela - KFC", 60)]),
+        'dt_converted': write_dt_converted(tmp_path / "dt.xlsx", "5 Mandela - KFC", 60),
+        'multi_store': write_raw(tmp_path / "multi.xlsx", [
+            ("5 Mandela - KFC", 40), ("12 Providence - KFC", 25), ("7 Vreed-en-Hoop - KFC", 33),
+        ]),
+    }
+
+
+@pytest.mark.parametrize('layout', ['raw', 'dt_converted', 'multi_store'])
+@pytest.mark.parametrize('engine', available_reader_engines())
+def test_engine_matches_reference(exports, layout, engine):
+    assert check_engine_output(exports[layout], engine)
+
+
+@pytest.mark.parametrize('layout, stores', [
+    ('raw', {"5 Mandela - KFC": 60}),
+    ('dt_converted', {"5 Mandela - KFC": 60}),
+    ('multi_store', {"5 Mandela - KFC": 40, "7 Vreed-en-Hoop - KFC": 33, "12 Providence - KFC": 25}),
+])
+def test_reference_reads_every_event(exports, layout, stores):
+    df = transform_data.transform_raw_car_data(exports[layout], 'pandas')
+    assert df['Store Name'].value_counts().to_dict() == stores
+    assert df['Daypart'].notna().all()
@@ -0,0 +1,141 @@
+"""
+Pipeline runs against a real template: rows pasted by one run must
+survive later runs, and no run may paste them again
+"""
+
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.append(str(SRC_DIR))
+
+from automation import complete_automation, pipeline
+from automation.context import RunContext
+from automation.transform_data import OUTPUT_COLUMNS
+
+DAY_1 = datetime(2025, 11, 4)
+DAY_2 = datetime(2025, 11, 5)
+
+
+def write_export(path, store, day, rows):
+    """DT-converted export (header in row 1), one car every 30 seconds from 6 AM"""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(OUTPUT_COLUMNS)
+    start = day + timedelta(hours=6)
+    for i in range(rows):
+        departure = start + timedelta(seconds=30 * i)
+        ws.append(['6:00AM - 10:59AM', store, departure.strftime('%m/%d/%Y %I:%M:%S %p'),
+                   'Car_Departure', 1, 30, 20, 100, 10, 200, 250])
+    wb.save(path)
+    return path
+
+
+def template_stores(template_path):
+    """Store Name of every data row in AllStores"""
+    ws = load_workbook(template_path)['AllStores']
+    return Counter(row[1] for row in ws.iter_rows(min_row=2, values_only=True) if row[1])
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setattr(complete_automation, 'USE_TRANSFORM_CACHE', False)
+    monkeypatch.setattr(complete_automation, 'TRANSFORM_JOBS', 1)
+
+    template_path = tmp_path / "template.xlsx"
+    wb = Workbook()
+    wb.active.title = 'AllStores'
+    wb.active.append(OUTPUT_COLUMNS)
+    wb.save(template_path)
+
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    return tmp_path
+
+
+def make_ctx(workspace, day):
+    return RunContext.default(
+        name='test',
+        template_path=str(workspace / "template.xlsx"),
+        downloads_folder=str(workspace / "downloads"),
+        formula_columns=[],
+        date_configs={},
+        target_date=day,
+        transform_jobs=1,
+    )
+
+
+def run(workspace, day):
+    return pipeline.run_daily_pipeline(
+        day, pipeline_dir=str(workspace / "state"), ctx=make_ctx(workspace, day)
+    )
+
+
+def test_second_run_keeps_rows_of_the_first(workspace):
+    export_a = write_export(workspace / "downloads" / "store_a.xlsx", "Store A", DAY_1, 25)
+    assert run(workspace, DAY_1)
+    assert template_stores(workspace / "template.xlsx") == {"Store A": 25}
+
+    export_a.unlink()
+    write_export(workspace / "downloads" / "store_b.xlsx", "Store B", DAY_2, 100)
+    assert run(workspace, DAY_2)
+    assert template_stores(workspace / "template.xlsx") == {"Store A": 25, "Store B": 100}
+
+
+def test_unchanged_inputs_skip_every_stage(workspace, capsys):
+    write_export(workspace / "downloads" / "store_a.xlsx", "Store A", DAY_1, 25)
+    assert run(workspace, DAY_1)
+    capsys.readouterr()
+
+    assert run(workspace, DAY_1)
+    assert "Ran: nothing (all inputs unchanged)" in capsys.readouterr().out
+    assert template_stores(workspace / "template.xlsx") == {"Store A": 25}
+
+
+def test_complete_automation_does_not_repaste_pipeline_rows(workspace):
+    write_export(workspace / "downloads" / "store_a.xlsx", "Store A", DAY_1, 25)
+    assert run(workspace, DAY_1)
+
+    assert complete_automation.main(ctx=make_ctx(workspace, DAY_1))
+    assert template_stores(workspace / "template.xlsx") == {"Store A": 25}
+
+
+def test_template_saved_elsewhere_reruns_update_without_duplicates(workspace, capsys):
+    write_export(workspace / "downloads" / "store_a.xlsx", "Store A", DAY_1, 25)
+    assert run(workspace, DAY_1)
+
+    # Another run saves the template in between
+    write_export(workspace / "downloads" / "store_b.xlsx", "Store B", DAY_1, 10)
+    assert complete_automation.main(ctx=make_ctx(workspace, DAY_1))
+    (workspace / "downloads" / "store_b.xlsx").unlink()
+    capsys.readouterr()
+
+    assert run(workspace, DAY_1)
+    assert "Ran: update" in capsys.readouterr().out
+    assert template_stores(workspace / "template.xlsx") == {"Store A": 25, "Store B": 10}
+
+
+def test_each_template_keeps_its_own_state(workspace, monkeypatch, capsys):
+    monkeypatch.setattr(pipeline, 'PIPELINE_DIR', str(workspace / "state"))
+    other = workspace / "other.xlsx"
+    other.write_bytes((workspace / "template.xlsx").read_bytes())
+    write_export(workspace / "downloads" / "store_a.xlsx", "Store A", DAY_1, 25)
+
+    ctx = make_ctx(workspace, DAY_1)
+    assert pipeline.run_daily_pipeline(DAY_1, ctx=ctx)
+    other_ctx = make_ctx(workspace, DAY_1)
+    other_ctx.template_path = str(other)
+    assert pipeline.run_daily_pipeline(DAY_1, ctx=other_ctx)
+    assert template_stores(other) == {"Store A": 25}
+    capsys.readouterr()
+
+    # The other template's run didn't overwrite the first one's fingerprints
+    assert pipeline.run_daily_pipeline(DAY_1, ctx=make_ctx(workspace, DAY_1))
+    assert "Ran: nothing (all inputs unchanged)" in capsys.readouterr().out
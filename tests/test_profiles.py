@@ -0,0 +1,75 @@
+"""
+profiles.json validation and single-profile runs
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.append(str(SRC_DIR))
+
+from automation import profiles
+
+
+def write_profiles(tmp_path, configured):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps(configured), encoding='utf-8')
+    return str(path)
+
+
+def market(tmp_path, name):
+    return {
+        'template_path': str(tmp_path / f"{name}.xlsx"),
+        'downloads_folder': str(tmp_path / "downloads" / name),
+        'stores': [f"(Ungrouped) {name} - KFC"],
+    }
+
+
+def test_profiles_load_with_their_own_paths(tmp_path):
+    loaded = profiles.load_profiles(write_profiles(tmp_path, {
+        'trinidad': market(tmp_path, 'trinidad'),
+        'barbados': dict(market(tmp_path, 'barbados'), date_configs={'Summary - Stores': 'B1'}),
+    }))
+    assert list(loaded) == ['guyana', 'trinidad', 'barbados']
+    assert loaded['barbados']['date_configs'] == {'Summary - Stores': 'B1'}
+    assert loaded['trinidad']['target_sheet'] == loaded['guyana']['target_sheet']
+
+
+@pytest.mark.parametrize('key', profiles.REQUIRED_KEYS)
+def test_missing_required_key_is_rejected(tmp_path, key):
+    config = market(tmp_path, 'trinidad')
+    del config[key]
+    with pytest.raises(ValueError, match=f"missing required keys: {key}"):
+        profiles.load_profiles(write_profiles(tmp_path, {'trinidad': config}))
+
+
+@pytest.mark.parametrize('key', profiles.PATH_KEYS)
+def test_shared_path_is_rejected(tmp_path, key):
+    trinidad, barbados = market(tmp_path, 'trinidad'), market(tmp_path, 'barbados')
+    barbados[key] = trinidad[key]
+    with pytest.raises(ValueError, match=f"'trinidad' and 'barbados' share {key}"):
+        profiles.load_profiles(write_profiles(tmp_path, {'trinidad': trinidad, 'barbados': barbados}))
+
+
+def test_path_shared_with_builtin_profile_is_rejected(tmp_path):
+    config = dict(market(tmp_path, 'trinidad'), downloads_folder=profiles.default_profile()['downloads_folder'])
+    with pytest.raises(ValueError, match="'guyana' and 'trinidad' share downloads_folder"):
+        profiles.load_profiles(write_profiles(tmp_path, {'trinidad': config}))
+
+
+def test_run_profile_logs_to_logs_dir_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiles, 'LOGS_DIR', str(tmp_path / "logs"))
+    profile = dict(profiles.default_profile(), name='trinidad', **market(tmp_path, 'trinidad'))
+
+    # Nothing downloaded - the run fails, but it has a log
+    name, success, log_path, _, _ = profiles.run_profile(profile)
+    assert (name, success) == ('trinidad', False)
+    assert os.path.dirname(log_path) == str(tmp_path / "logs")
+    assert os.path.basename(log_path).startswith('trinidad_')
+    assert "No files found" in Path(log_path).read_text(encoding='utf-8')
@@ -0,0 +1,132 @@
+"""
+Scheduled catch-up runs: the remembered date moves past every day that
+was downloaded, with or without rows, and stops at a failed download
+"""
+
+import json
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.append(str(SRC_DIR))
+
+from automation import complete_automation, profiles, scheduler
+from automation.transform_data import OUTPUT_COLUMNS
+
+LAST_SUCCESS = datetime(2025, 12, 23)
+CLOSED_DAY = datetime(2025, 12, 25)
+NOW = datetime(2025, 12, 27, 12, 0)    # Queues Dec 24 - Dec 26
+STORES = ["(Ungrouped) 5 Mandela - KFC", "(Ungrouped) 12 Providence - KFC"]
+
+
+def write_export(path, store, day, rows):
+    """DT-converted export (header in row 1), one car every 30 seconds from 6 AM"""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(OUTPUT_COLUMNS)
+    start = day + timedelta(hours=6)
+    for i in range(rows):
+        departure = start + timedelta(seconds=30 * i)
+        ws.append(['6:00AM - 10:59AM', store, departure.strftime('%m/%d/%Y %I:%M:%S %p'),
+                   'Car_Departure', 1, 30, 20, 100, 10, 200, 250])
+    wb.save(path)
+
+
+def template_days(template_path):
+    """Data rows in AllStores per departure day"""
+    ws = load_workbook(template_path)['AllStores']
+    return Counter(str(row[2])[:10] for row in ws.iter_rows(min_row=2, values_only=True) if row[1])
+
+
+@pytest.fixture
+def market(tmp_path, monkeypatch):
+    monkeypatch.setattr(complete_automation, 'USE_TRANSFORM_CACHE', False)
+    monkeypatch.setattr(profiles, 'LOGS_DIR', str(tmp_path / "logs"))
+    # The run stays in this process so the fake download below applies
+    monkeypatch.setattr(scheduler, 'ProcessPoolExecutor', ThreadPoolExecutor)
+
+    template_path = tmp_path / "market.xlsx"
+    wb = Workbook()
+    wb.active.title = 'AllStores'
+    wb.active.append(OUTPUT_COLUMNS)
+    wb.save(template_path)
+
+    profiles_file = tmp_path / "profiles.json"
+    profiles_file.write_text(json.dumps({'market': {
+        'template_path': str(template_path),
+        'downloads_folder': str(tmp_path / "downloads"),
+        'stores': STORES,
+        'formula_columns': [],
+        'date_configs': {},
+    }}), encoding='utf-8')
+
+    state_file = tmp_path / "scheduler.json"
+    state_file.write_text(json.dumps({
+        'guyana': {'last_success': '2999-01-01'},   # Never due
+        'market': {'last_success': LAST_SUCCESS.strftime('%Y-%m-%d')},
+    }), encoding='utf-8')
+    return {'template': template_path, 'profiles': str(profiles_file), 'state': str(state_file)}
+
+
+def fake_downloads(monkeypatch, failing=()):
+    """Every store exports 20 cars a day - none on CLOSED_DAY, nothing at all on failing days"""
+    def download_all_stores(report_date=None, ctx=None, **_):
+        if report_date in failing:
+            return False
+        for index, store in enumerate(ctx.stores):
+            path = Path(ctx.downloads_folder) / f"{report_date:%Y%m%d}_{index}.xlsx"
+            write_export(path, store, report_date, 0 if report_date == CLOSED_DAY else 20)
+            ctx.add_download(store, report_date, str(path))
+        return True
+
+    monkeypatch.setattr(profiles.hmecloud, 'download_all_stores', download_all_stores)
+
+
+def run_scheduler(market):
+    failed = scheduler.run_due(market['profiles'], market['state'], download=True, now=NOW)
+    with open(market['state'], encoding='utf-8') as f:
+        return failed, json.load(f)['market']
+
+
+def test_day_without_data_does_not_hold_back_the_schedule(market, monkeypatch):
+    fake_downloads(monkeypatch)
+
+    failed, entry = run_scheduler(market)
+    assert failed == 0
+    assert (entry['last_success'], entry['last_result']) == ('2025-12-26', 'ok')
+    assert template_days(market['template']) == {'12/24/2025': 40, '12/26/2025': 40}
+
+
+def test_only_closed_day_queued_still_advances(market, monkeypatch):
+    fake_downloads(monkeypatch)
+    with open(market['state'], encoding='utf-8') as f:
+        state = json.load(f)
+    state['market']['last_success'] = '2025-12-24'
+    with open(market['state'], 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+    failed = scheduler.run_due(market['profiles'], market['state'], download=True,
+                               now=CLOSED_DAY + timedelta(days=1, hours=12))
+    with open(market['state'], encoding='utf-8') as f:
+        entry = json.load(f)['market']
+    assert failed == 0
+    assert (entry['last_success'], entry['last_result']) == ('2025-12-25', 'ok')
+    assert template_days(market['template']) == {}
+
+
+def test_failed_download_holds_back_its_day(market, monkeypatch):
+    fake_downloads(monkeypatch, failing={datetime(2025, 12, 26)})
+
+    failed, entry = run_scheduler(market)
+    assert failed == 1
+    # Dec 24 pasted, Dec 25 downloaded with no data, Dec 26 is queued again
+    assert (entry['last_success'], entry['last_result']) == ('2025-12-25', 'partial')
+    assert template_days(market['template']) == {'12/24/2025': 40}